@@ -20,3 +20,36 @@ export const generateRoadmap = async (goal) => {
         throw error;
     }
 };
+
+// Streams a roadmap as NDJSON events ("skeleton", "node", "done", "error").
+// onEvent is called once per event as soon as it arrives.
+export const streamRoadmap = async (goal, onEvent) => {
+    const response = await fetch(`${API_BASE_URL}/generate-roadmap/stream`, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({ goal }),
+    });
+
+    if (!response.ok) {
+        throw new Error('Failed to generate roadmap');
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        const lines = buffer.split('\n');
+        buffer = lines.pop();
+        for (const line of lines) {
+            if (line.trim()) onEvent(JSON.parse(line));
+        }
+    }
+    if (buffer.trim()) onEvent(JSON.parse(buffer));
+};
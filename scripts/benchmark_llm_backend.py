@@ -0,0 +1,70 @@
+import os
+import sys
+import time
+import asyncio
+import argparse
+
+# Streams completions through LLMBackend and reports latency percentiles, with and without hedging.
+# Runs against the local stub (simulated tail latency) unless --base-url points at a real server.
+
+sys.path.append(os.getcwd())
+
+from src.dependencies import create_async_openai_client, LLM_MODEL
+from src.llm_backend import LLMBackend
+from src.metrics import metrics
+
+async def run(base_url: str, model: str, requests: int, concurrency: int, hedge: bool) -> list[float]:
+    client = create_async_openai_client(base_url=base_url)
+    backend = LLMBackend(client=client.with_options(max_retries=0), model=model, hedge=hedge)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            stream = await backend.create(messages=[{"role": "user", "content": "Learn Git"}], stream=True)
+            async for _ in stream:
+                pass
+            latencies.append(time.perf_counter() - start)
+
+    try:
+        await asyncio.gather(*[one() for _ in range(requests)])
+    finally:
+        await client.close()
+    return sorted(latencies)
+
+def percentile(ordered: list[float], q: float) -> float:
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark LLM request latency and hedging.")
+    parser.add_argument("--base-url", help="OpenAI-compatible server (default: start the local stub)")
+    parser.add_argument("--model", default=LLM_MODEL)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.02, help="Stub first-token latency")
+    parser.add_argument("--tail-latency", type=float, default=0.5, help="Stub first-token latency of slow requests")
+    parser.add_argument("--tail-rate", type=float, default=0.02, help="Stub fraction of slow requests")
+    args = parser.parse_args()
+
+    server = None
+    base_url = args.base_url
+    if base_url is None:
+        from scripts.llm_stub_server import start_stub_server
+        server, base_url = start_stub_server(latency=args.latency, tail_latency=args.tail_latency, tail_rate=args.tail_rate)
+    print(f"Benchmarking {args.requests} requests (concurrency {args.concurrency}) against {base_url}")
+
+    try:
+        for hedge in (False, True):
+            attempts = metrics.counter("llm_attempts_total").value
+            ordered = asyncio.run(run(base_url, args.model, args.requests, args.concurrency, hedge))
+            extra = metrics.counter("llm_attempts_total").value - attempts - args.requests
+            print(f"{'hedged' if hedge else 'plain':>7}: p50 {percentile(ordered, 0.5) * 1000:.0f}ms  "
+                  f"p95 {percentile(ordered, 0.95) * 1000:.0f}ms  p99 {percentile(ordered, 0.99) * 1000:.0f}ms  "
+                  f"extra requests {extra / args.requests:.1%}")
+    finally:
+        if server is not None:
+            server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,7 @@ import json
 import os
 import math
 import sys
+import asyncio
 from dotenv import load_dotenv
 
 # Add project root to path
@@ -26,7 +27,7 @@ def ndcg_at_k(r, k):
         return 0.0
     return dcg_at_k(r, k) / dcg_max
 
-def evaluate_retrieval():
+async def evaluate_retrieval():
     if not os.path.exists(GROUND_TRUTH_FILE):
         print(f"Error: Ground truth file not found at {GROUND_TRUTH_FILE}")
         return
@@ -56,7 +57,7 @@ def evaluate_retrieval():
         retrieved_ids = []
         try:
             # find_resources returns Resource objects
-            resources = resource_agent.find_resources(query, limit=TOP_K)
+            resources = await resource_agent.find_resources(query, limit=TOP_K)
             # Extract IDs from resources
             retrieved_ids = [res.id for res in resources if res.id]
         except Exception as e:
@@ -92,5 +93,13 @@ def evaluate_retrieval():
     print(f"Average NDCG@{TOP_K}:   {avg_ndcg:.4f}")
     print("-" * 30)
 
+async def main():
+    from src.dependencies import close_clients
+    try:
+        await evaluate_retrieval()
+    finally:
+        # Shared clients are bound to this event loop
+        await close_clients()
+
 if __name__ == "__main__":
-    evaluate_retrieval()
+    asyncio.run(main())
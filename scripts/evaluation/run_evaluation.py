@@ -2,23 +2,43 @@ import json
 import os
 import sys
 import glob
+import time
+import asyncio
+import argparse
 
 # Add project root to path
 sys.path.append(os.getcwd())
 
-from src.agents.roadmap_agent import RoadmapAgent
+from src.agents.roadmap_agent import RoadmapAgent, PROMPT_PROFILES
 from src.agents.eval_agent import EvaluationAgent
+from src.metrics import metrics
 from src.models import RoadmapResponse, RoadmapNode
 
+# OpenAI only caches prompt prefixes of at least this many tokens
+PROMPT_CACHE_MIN_TOKENS = 1024
+
 def load_ground_truth(file_path):
     with open(file_path, "r") as f:
         return json.load(f)
 
-def run_evaluation():
+def prompt_size(roadmap_agent, goal):
+    """
+    Characters of the whole prompt and of its static prefix (everything before the goal message).
+    """
+    messages = roadmap_agent._roadmap_messages(goal)
+    return sum(len(m["content"]) for m in messages), sum(len(m["content"]) for m in messages[:-1])
+
+async def run_evaluation(prompt_profile=None):
     print("Starting Evaluation...")
     
-    roadmap_agent = RoadmapAgent()
+    roadmap_agent = RoadmapAgent(prompt_profile=prompt_profile) if prompt_profile else RoadmapAgent()
+    print(f"Prompt profile: {roadmap_agent.prompt_profile}")
+    # Rough size (about 4 characters per token) so profiles can be compared without an API key
+    total, prefix = prompt_size(roadmap_agent, "Learn Git")
+    print(f"Prompt size: {total} chars (~{total // 4} tokens), static prefix ~{prefix // 4} tokens "
+          f"(prefix caching starts at {PROMPT_CACHE_MIN_TOKENS})")
     eval_agent = EvaluationAgent()
+    before = metrics.snapshot()
     
     manual_data_dir = os.path.join("data", "manual")
     json_files = glob.glob(os.path.join(manual_data_dir, "*.json"))
@@ -37,7 +57,9 @@ def run_evaluation():
         # 1. Generate Roadmap
         print(f"Generating roadmap for '{skill}'...")
         try:
-            nodes_data = roadmap_agent.generate_structure(skill)
+            start = time.perf_counter()
+            nodes_data = await roadmap_agent.generate_structure(skill)
+            generation_time = time.perf_counter() - start
             # Convert to RoadmapResponse object for evaluation
             roadmap_nodes = [
                 RoadmapNode(
@@ -60,14 +82,15 @@ def run_evaluation():
             
         # 3. Evaluate Structure
         print("Calculating metrics...")
-        metrics = eval_agent.evaluate_roadmap_structure(generated_roadmap, gt_topics)
+        scores = eval_agent.evaluate_roadmap_structure(generated_roadmap, gt_topics)
         
-        print(f"ROUGE-L: {metrics['rouge_l']:.4f}")
-        print(f"BERTScore F1: {metrics['bert_score']:.4f}")
+        print(f"ROUGE-L: {scores['rouge_l']:.4f}")
+        print(f"BERTScore F1: {scores['bert_score']:.4f}")
         
         results.append({
             "skill": skill,
-            "metrics": metrics
+            "metrics": scores,
+            "generation_time": generation_time
         })
         
     # Summary
@@ -79,5 +102,56 @@ def run_evaluation():
     print(f"Average ROUGE-L: {avg_rouge:.4f}")
     print(f"Average BERTScore F1: {avg_bert:.4f}")
 
+    # Cost and latency of the generation calls (LLM cache hits use no tokens); this run only
+    after = metrics.snapshot()
+    calls = after.get("llm_prompt_tokens", {}).get("count", 0) - before.get("llm_prompt_tokens", {}).get("count", 0)
+    usage = {
+        name: after.get(name, 0) - before.get(name, 0)
+        for name in ("llm_cache_hits_total", "llm_prompt_tokens_total", "llm_cached_prompt_tokens_total", "llm_completion_tokens_total")
+    }
+    avg_time = sum(r["generation_time"] for r in results) / len(results) if results else 0
+    print(f"LLM calls: {calls} (cache hits: {usage['llm_cache_hits_total']})")
+    if calls:
+        print(f"Average prompt tokens: {usage['llm_prompt_tokens_total'] / calls:.0f} (cached: {usage['llm_cached_prompt_tokens_total'] / calls:.0f})")
+        print(f"Average completion tokens: {usage['llm_completion_tokens_total'] / calls:.0f}")
+    print(f"Average generation time: {avg_time:.2f}s")
+
+    return {
+        "profile": roadmap_agent.prompt_profile,
+        "roadmaps": len(results),
+        "rouge_l": avg_rouge,
+        "bert_score": avg_bert,
+        "prompt_tokens": usage["llm_prompt_tokens_total"] / calls if calls else None,
+        "cached_tokens": usage["llm_cached_prompt_tokens_total"] / calls if calls else None,
+        "completion_tokens": usage["llm_completion_tokens_total"] / calls if calls else None,
+        "generation_time": avg_time,
+    }
+
+def print_comparison(summaries):
+    def cell(value, digits=0):
+        return "-" if value is None else f"{value:.{digits}f}"
+
+    print("\n=== Prompt Profile Comparison ===")
+    print(f"{'profile':<10} {'roadmaps':>8} {'ROUGE-L':>8} {'BERTScore':>9} {'prompt tok':>10} {'cached tok':>10} {'compl tok':>9} {'time (s)':>8}")
+    for s in summaries:
+        print(f"{s['profile']:<10} {s['roadmaps']:>8} {s['rouge_l']:>8.4f} {s['bert_score']:>9.4f} "
+              f"{cell(s['prompt_tokens']):>10} {cell(s['cached_tokens']):>10} {cell(s['completion_tokens']):>9} {s['generation_time']:>8.2f}")
+
+async def main():
+    from src.dependencies import close_clients
+
+    parser = argparse.ArgumentParser(description="Evaluate generated roadmaps against data/manual.")
+    parser.add_argument("--prompt-profile", choices=PROMPT_PROFILES + ("all",),
+                        help="Prompt profile (default: PROMPT_PROFILE); 'all' runs each one and compares them")
+    args = parser.parse_args()
+    try:
+        if args.prompt_profile == "all":
+            print_comparison([await run_evaluation(profile) for profile in PROMPT_PROFILES])
+        else:
+            await run_evaluation(args.prompt_profile)
+    finally:
+        # Shared clients are bound to this event loop
+        await close_clients()
+
 if __name__ == "__main__":
-    run_evaluation()
+    asyncio.run(main())
@@ -0,0 +1,87 @@
+import os
+import sys
+import json
+import glob
+import time
+import random
+import argparse
+import numpy as np
+
+# Add project root to path
+sys.path.append(os.getcwd())
+
+from src.dependencies import EMBEDDING_MODEL_NAME, ONNX_MODEL_DIR, ONNX_QUANTIZATION
+from src.embedding import load_sentence_encoder
+
+# One-time export of the embedding model to ONNX (fp32 + dynamic int8), followed by an
+# accuracy check of both variants against the PyTorch embeddings on our own corpus.
+# Dynamic int8 quantization computes activation ranges at runtime, so no calibration set is needed.
+
+CORPUS_FILE = os.path.join("data", "processed", "unified_corpus.json")
+MANUAL_DIR = os.path.join("data", "manual")
+
+def export(model_name: str, output_dir: str, quantization: str):
+    from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+
+    print(f"Exporting {model_name} to ONNX in {output_dir}...")
+    model = SentenceTransformer(model_name, backend="onnx")
+    model.save_pretrained(output_dir)
+
+    print(f"Quantizing to int8 ({quantization})...")
+    export_dynamic_quantized_onnx_model(model, quantization_config=quantization, model_name_or_path=output_dir)
+
+def load_sample_texts(samples: int) -> list[str]:
+    texts = []
+    if os.path.exists(CORPUS_FILE):
+        with open(CORPUS_FILE, "r", encoding="utf-8") as f:
+            texts = [f"{item['title']}: {item['description']}" for item in json.load(f)]
+    else:
+        # Fall back to roadmap topics when the corpus hasn't been processed yet
+        for path in glob.glob(os.path.join(MANUAL_DIR, "*.json")):
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            for stage in data.get("roadmap", []) if isinstance(data, dict) else []:
+                texts.extend(f"{stage.get('title', '')}: {topic}" for topic in stage.get("topics", []))
+    random.Random(0).shuffle(texts)
+    return texts[:samples]
+
+def timed_encode(model, texts: list[str]):
+    start = time.perf_counter()
+    vectors = model.encode(texts, convert_to_numpy=True, normalize_embeddings=True, batch_size=64)
+    return vectors, time.perf_counter() - start
+
+def check_accuracy(model_name: str, output_dir: str, quantization: str, samples: int, k: int = 10):
+    texts = load_sample_texts(samples)
+    if not texts:
+        print("No texts found for the accuracy check.")
+        return
+    print(f"\nAccuracy check on {len(texts)} texts (reference: torch)")
+
+    reference, reference_time = timed_encode(load_sentence_encoder(model_name, backend="torch"), texts)
+    reference_neighbors = np.argsort(-(reference @ reference.T), axis=1)[:, 1:k + 1]
+    print(f"{'backend':<10} {'mean cos':>9} {'min cos':>9} {f'top-{k} overlap':>14} {'texts/s':>9}")
+    print(f"{'torch':<10} {1.0:>9.4f} {1.0:>9.4f} {1.0:>14.3f} {len(texts) / reference_time:>9.1f}")
+
+    for backend in ("onnx", "onnx-int8"):
+        model = load_sentence_encoder(model_name, backend=backend, onnx_dir=output_dir, quantization=quantization)
+        vectors, elapsed = timed_encode(model, texts)
+        cosines = np.sum(vectors * reference, axis=1)
+        neighbors = np.argsort(-(vectors @ vectors.T), axis=1)[:, 1:k + 1]
+        overlap = np.mean([len(set(a) & set(b)) / k for a, b in zip(neighbors, reference_neighbors)])
+        print(f"{backend:<10} {cosines.mean():>9.4f} {cosines.min():>9.4f} {overlap:>14.3f} {len(texts) / elapsed:>9.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the embedding model to ONNX (fp32 and int8) and check accuracy.")
+    parser.add_argument("--model", default=EMBEDDING_MODEL_NAME, help="Sentence-transformers model name")
+    parser.add_argument("--output-dir", default=ONNX_MODEL_DIR, help="Where to write the ONNX models")
+    parser.add_argument("--quantization", default=ONNX_QUANTIZATION, choices=["arm64", "avx2", "avx512", "avx512_vnni"], help="Target instruction set for int8")
+    parser.add_argument("--samples", type=int, default=1000, help="Number of corpus texts for the accuracy check")
+    parser.add_argument("--skip-export", action="store_true", help="Only run the accuracy check")
+    args = parser.parse_args()
+
+    if not args.skip_export:
+        export(args.model, args.output_dir, args.quantization)
+    check_accuracy(args.model, args.output_dir, args.quantization, args.samples)
+
+if __name__ == "__main__":
+    main()
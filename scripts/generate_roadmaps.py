@@ -1,15 +1,14 @@
 import os
+import sys
 import json
+import asyncio
 import argparse
+from pathlib import Path
 from typing import List
 from roadmap_schema import Roadmap
 
-# Try to import openai, handle if missing
-try:
-    from openai import OpenAI
-except ImportError:
-    print("Error: 'openai' package not found. Please install it using: pip install openai")
-    OpenAI = None
+# Project root, for the shared LLM backend
+sys.path.append(str(Path(__file__).resolve().parent.parent))
 
 try:
     from dotenv import load_dotenv
@@ -40,16 +39,11 @@ Format as JSON matching this schema:
 Make it realistic with proper prerequisites and progression. Ensure the JSON is valid.
 """
 
-def generate_roadmap(client, skill: str, model: str = "gpt-4o"):
-    if not client:
-        print("OpenAI client not initialized.")
-        return None
-
+async def generate_roadmap(backend, skill: str):
     prompt = PROMPT_TEMPLATE.format(skill=skill)
     
     try:
-        response = client.chat.completions.create(
-            model=model,
+        response = await backend.create(
             messages=[
                 {"role": "system", "content": "You are an expert curriculum designer."},
                 {"role": "user", "content": prompt}
@@ -68,25 +62,27 @@ def generate_roadmap(client, skill: str, model: str = "gpt-4o"):
         print(f"Error generating roadmap for {skill}: {e}")
         return None
 
-def main():
+async def main():
+    from src.dependencies import LLM_BASE_URL, LLM_MODEL, create_async_openai_client
+    from src.llm_backend import LLMBackend
+
     parser = argparse.ArgumentParser(description="Generate synthetic roadmaps.")
     parser.add_argument("--skills", nargs="+", help="List of skills to generate roadmaps for")
     parser.add_argument("--api-key", help="OpenAI API Key (or set OPENAI_API_KEY env var)")
-    parser.add_argument("--base-url", help="Base URL for local LLM (e.g., http://localhost:11434/v1)")
-    parser.add_argument("--model", default="gpt-4o", help="Model name to use")
+    parser.add_argument("--base-url", default=LLM_BASE_URL, help="Base URL for local LLM (e.g., http://localhost:11434/v1; default: LLM_BASE_URL)")
+    parser.add_argument("--model", default=LLM_MODEL, help="Model name to use (default: LLM_MODEL)")
     parser.add_argument("--output-dir", default="../data/synthetic", help="Output directory")
     
     args = parser.parse_args()
     
-    if not OpenAI:
-        return
-
     api_key = args.api_key or os.environ.get("OPENAI_API_KEY")
     if not api_key and not args.base_url:
         print("Warning: No API Key provided. If using a local LLM that doesn't require a key, ignore this.")
         api_key = "dummy" # Some local servers need a non-empty key
 
-    client = OpenAI(api_key=api_key, base_url=args.base_url)
+    # Same timeouts, retries and connection pooling as the API
+    client = create_async_openai_client(base_url=args.base_url, api_key=api_key)
+    backend = LLMBackend(client=client.with_options(max_retries=0), model=args.model)
     
     # Resolve output directory relative to this script file to ensure it goes to DataAug/data/synthetic
     # regardless of where the command is run from.
@@ -119,7 +115,7 @@ def main():
 
     for skill in skills_to_generate:
         print(f"Generating roadmap for: {skill}...")
-        roadmap_data = generate_roadmap(client, skill, args.model)
+        roadmap_data = await generate_roadmap(backend, skill)
         
         if roadmap_data:
             # Sanitize filename: replace spaces with underscores, remove non-alphanumeric chars except underscores
@@ -134,6 +130,7 @@ def main():
                 json.dump(roadmap_data, f, indent=2)
             print(f"Saved to {file_path}")
 
+    await client.close()
+
 if __name__ == "__main__":
-    from pathlib import Path
-    main()
+    asyncio.run(main())
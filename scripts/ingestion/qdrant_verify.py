@@ -1,6 +1,12 @@
-from qdrant_client import QdrantClient
+import os
+import sys
 
-client = QdrantClient(host="localhost", port=6333)
+# Add project root to path
+sys.path.append(os.getcwd())
+
+from src.dependencies import get_qdrant_client
+
+client = get_qdrant_client()
 
 print("\n=== Collections ===")
 print(client.get_collections())
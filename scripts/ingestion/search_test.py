@@ -1,7 +1,13 @@
-from qdrant_client import QdrantClient
+import os
+import sys
+
+# Add project root to path
+sys.path.append(os.getcwd())
+
+from src.dependencies import get_qdrant_client
 from sentence_transformers import SentenceTransformer
 
-client = QdrantClient(host="localhost", port=6333)
+client = get_qdrant_client()
 model = SentenceTransformer("all-MiniLM-L6-v2")
 
 COLLECTION = "educational_resources"
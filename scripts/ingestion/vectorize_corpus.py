@@ -1,19 +1,38 @@
 import json
 import os
-from sentence_transformers import SentenceTransformer
-from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams, PointStruct
+import sys
+import argparse
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Add project root to path
+sys.path.append(os.getcwd())
+
 # Configuration
 INPUT_FILE = os.path.join("data", "processed", "unified_corpus.json")
 COLLECTION_NAME = "educational_resources"
-QDRANT_URL = os.getenv("QDRANT_URL", "http://localhost:6333")
 MODEL_NAME = "all-MiniLM-L6-v2"
 
-def vectorize_corpus():
+def make_snippet(description):
+    from src.collection_profiles import SNIPPET_LENGTH
+    return description[:SNIPPET_LENGTH]
+
+def compact_payload(item):
+    # Only the fields the API returns, to keep local index payload tables small
+    return {
+        "id": str(item['id']),
+        "title": item['title'],
+        "url": item['url'],
+        "snippet": make_snippet(item['description']),
+        "content_type": item['content_type']
+    }
+
+def vectorize_corpus(local_index_dir=None, local_index_dtype="float32", backend="torch", bm25_dir=None, profile="default",
+                     skip_qdrant=False, hnsw=True):
+    if skip_qdrant and not local_index_dir:
+        print("Error: --skip-qdrant needs --local-index-dir (there would be nothing to write)")
+        return
     if not os.path.exists(INPUT_FILE):
         print(f"Error: Unified corpus not found at {INPUT_FILE}")
         return
@@ -22,21 +41,37 @@ def vectorize_corpus():
     with open(INPUT_FILE, 'r', encoding='utf-8') as f:
         corpus = json.load(f)
         
-    print(f"Loading model {MODEL_NAME}...")
-    model = SentenceTransformer(MODEL_NAME)
-    
-    print(f"Connecting to Qdrant at {QDRANT_URL}...")
-    client = QdrantClient(url=QDRANT_URL)
+    from src.dependencies import ONNX_MODEL_DIR, ONNX_QUANTIZATION, QDRANT_URL, get_qdrant_client
+    from src.embedding import load_sentence_encoder
+
+    print(f"Loading model {MODEL_NAME} ({backend})...")
+    model = load_sentence_encoder(MODEL_NAME, backend=backend, onnx_dir=ONNX_MODEL_DIR, quantization=ONNX_QUANTIZATION)
     
-    # Recreate collection
-    client.recreate_collection(
-        collection_name=COLLECTION_NAME,
-        vectors_config=VectorParams(size=384, distance=Distance.COSINE),
-    )
+    client = None
+    if skip_qdrant:
+        print("Skipping Qdrant; only writing the local indexes")
+    else:
+        from qdrant_client.models import PointStruct
+        from src.collection_profiles import get_profile, build_collection_config, create_payload_indexes
+
+        print(f"Connecting to Qdrant at {QDRANT_URL}...")
+        client = get_qdrant_client()
+
+        # Recreate collection with the selected profile
+        print(f"Creating collection {COLLECTION_NAME} (profile: {profile})...")
+        if client.collection_exists(COLLECTION_NAME):
+            client.delete_collection(COLLECTION_NAME)
+        client.create_collection(
+            collection_name=COLLECTION_NAME,
+            **build_collection_config(get_profile(profile), vector_size=384)
+        )
+        create_payload_indexes(client, COLLECTION_NAME)
     
     print("Generating embeddings and indexing...")
     batch_size = 100
     total = len(corpus)
+    local_vectors = []
+    local_payloads = []
     
     for i in range(0, total, batch_size):
         batch = corpus[i:i+batch_size]
@@ -45,28 +80,79 @@ def vectorize_corpus():
         texts = [f"{item['title']}: {item['description']}" for item in batch]
         embeddings = model.encode(texts)
         
-        points = []
-        for j, item in enumerate(batch):
-            points.append(PointStruct(
-                id=item['id'],
-                vector=embeddings[j].tolist(),
-                payload={
-                    "title": item['title'],
-                    "description": item['description'],
-                    "url": item['url'],
-                    "source": item['source'],
-                    "content_type": item['content_type'],
-                    "quality_score": item['quality_score']
-                }
-            ))
-            
-        client.upsert(
-            collection_name=COLLECTION_NAME,
-            points=points
-        )
+        if client is not None:
+            points = []
+            for j, item in enumerate(batch):
+                points.append(PointStruct(
+                    id=item['id'],
+                    vector=embeddings[j].tolist(),
+                    payload={
+                        "title": item['title'],
+                        "description": item['description'],
+                        "snippet": make_snippet(item['description']),
+                        "url": item['url'],
+                        "source": item['source'],
+                        "content_type": item['content_type'],
+                        "quality_score": item['quality_score']
+                    }
+                ))
+
+            client.upsert(
+                collection_name=COLLECTION_NAME,
+                points=points
+            )
+
+        if local_index_dir:
+            local_vectors.append(embeddings)
+            local_payloads.extend(compact_payload(item) for item in batch)
         print(f"Processed {min(i+batch_size, total)}/{total} records")
 
+    if local_index_dir:
+        import numpy as np
+        from src.retrieval import write_embedded_index
+
+        vectors = np.vstack(local_vectors) if local_vectors else np.zeros((0, 384), dtype=np.float32)
+        # The HNSW graph is built here, once, so serving workers only load it (LOCAL_INDEX_HNSW=1)
+        write_embedded_index(local_index_dir, vectors, local_payloads, dtype=local_index_dtype, hnsw=hnsw)
+        print(f"Wrote embedded index ({local_index_dtype}) to {local_index_dir}")
+
+    if bm25_dir:
+        from src.lexical import BM25Index
+
+        print("Building BM25 index...")
+        bm25 = BM25Index.build(
+            [f"{item['title']} {item['description']}" for item in corpus],
+            [compact_payload(item) for item in corpus]
+        )
+        bm25.save(bm25_dir)
+        print(f"Wrote BM25 index ({len(bm25.vocab)} terms) to {bm25_dir}")
+
+    from src.cache import write_corpus_version
+    from src.dependencies import CORPUS_VERSION_PATH
+
+    # Running servers see the new marker and stop serving node resources from the old index
+    version = write_corpus_version(CORPUS_VERSION_PATH)
+    print(f"Corpus version {version} written to {CORPUS_VERSION_PATH}")
     print("Vectorization and indexing complete.")
 
 if __name__ == "__main__":
-    vectorize_corpus()
+    parser = argparse.ArgumentParser(description="Embed the unified corpus and index it in Qdrant (and/or a local embedded index).")
+    parser.add_argument("--local-index-dir", help="Also write an embedded index for RETRIEVAL_BACKEND=embedded (e.g. data/index)")
+    parser.add_argument("--local-index-dtype", default="float32", choices=["float32", "float16"], help="Storage dtype of the embedded index")
+    parser.add_argument("--backend", default="torch", choices=["torch", "onnx", "onnx-int8"], help="Encoder backend (ONNX variants need scripts/export_onnx_encoder.py)")
+    parser.add_argument("--bm25-dir", default=os.path.join("data", "index", "bm25"), help="Where to write the BM25 index for hybrid search")
+    parser.add_argument("--no-bm25", action="store_true", help="Skip building the BM25 index")
+    parser.add_argument("--profile", default=os.getenv("QDRANT_COLLECTION_PROFILE", "default"), choices=["default", "balanced", "low_memory"], help="Collection profile (quantization, HNSW, on-disk storage)")
+    parser.add_argument("--no-hnsw", action="store_true", help="Don't build the HNSW graph of the local index")
+    parser.add_argument("--skip-qdrant", action="store_true", help="Only write the local indexes (--local-index-dir, BM25); no Qdrant server needed")
+    args = parser.parse_args()
+
+    vectorize_corpus(
+        local_index_dir=args.local_index_dir,
+        local_index_dtype=args.local_index_dtype,
+        backend=args.backend,
+        bm25_dir=None if args.no_bm25 else args.bm25_dir,
+        profile=args.profile,
+        skip_qdrant=args.skip_qdrant,
+        hnsw=not args.no_hnsw
+    )
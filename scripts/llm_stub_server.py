@@ -0,0 +1,149 @@
+"""
+Local OpenAI-compatible chat completions server for tests and benchmarks (no API key, no network).
+
+    python scripts/llm_stub_server.py --port 8100 --latency 0.2 --tail-latency 3 --tail-rate 0.05
+    LLM_BASE_URL=http://localhost:8100/v1 uvicorn src.main:app
+
+Every answer is the same canned roadmap, valid for both RoadmapAgent ("nodes") and
+scripts/generate_roadmaps.py ("roadmap"). Latency before the first token is `latency`,
+or `tail_latency` for a `tail_rate` fraction of requests, to exercise timeouts and hedging.
+"""
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+ROADMAP = {
+    "skill": "Stub Skill",
+    "prerequisites": [],
+    "roadmap": [
+        {"stage": 1, "title": "Foundations", "topics": ["Basics", "Tooling"], "estimated_time": "2 weeks"},
+        {"stage": 2, "title": "Practice", "topics": ["Projects"], "estimated_time": "4 weeks"},
+    ],
+    "source": "synthetic_llm",
+    "annotator": "LLM",
+    "nodes": [
+        {"id": "basics", "title": "Basics", "description": "Core concepts, Terminology", "prerequisites": []},
+        {"id": "tooling", "title": "Tooling", "description": "Setup, Editors, CLI", "prerequisites": ["basics"]},
+        {"id": "projects", "title": "Projects", "description": "Small builds, Code review", "prerequisites": ["basics", "tooling"]},
+    ],
+}
+
+class StubConfig:
+    def __init__(self, latency: float = 0.0, tail_latency: float = 0.0, tail_rate: float = 0.0,
+                 chunk_size: int = 16, chunk_delay: float = 0.0, error_rate: float = 0.0):
+        self.latency = latency
+        self.tail_latency = tail_latency
+        self.tail_rate = tail_rate
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+        self.error_rate = error_rate
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def first_token_delay(self) -> float:
+        return self.tail_latency if random.random() < self.tail_rate else self.latency
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like a real provider
+    config = StubConfig()
+
+    def do_POST(self):
+        try:
+            self._respond()
+        except (BrokenPipeError, ConnectionResetError):
+            # Client gave up (attempt timeout or lost hedge)
+            self.close_connection = True
+
+    def _respond(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            return self._json(404, {"error": {"message": f"Unknown path {self.path}"}})
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        with self.config.lock:
+            self.config.requests += 1
+            request_id = f"chatcmpl-stub-{self.config.requests}"
+        if random.random() < self.config.error_rate:
+            return self._json(503, {"error": {"message": "Stub overloaded", "type": "server_error"}})
+
+        time.sleep(self.config.first_token_delay())
+        content = json.dumps(ROADMAP)
+        model = body.get("model", "stub")
+        prompt_tokens = sum(len(str(m.get("content", "")).split()) for m in body.get("messages", []))
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(content) // 4,
+                 "total_tokens": prompt_tokens + len(content) // 4}
+
+        if not body.get("stream"):
+            return self._json(200, {
+                "id": request_id, "object": "chat.completion", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": usage,
+            })
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        base = {"id": request_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model}
+        for i in range(0, len(content), self.config.chunk_size):
+            delta = {"content": content[i:i + self.config.chunk_size]}
+            self._event({**base, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]})
+            if self.config.chunk_delay:
+                time.sleep(self.config.chunk_delay)
+        self._event({**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+        if (body.get("stream_options") or {}).get("include_usage"):
+            self._event({**base, "choices": [], "usage": usage})
+        self._write(b"data: [DONE]\n\n")
+        self._write(b"")
+
+    def _event(self, payload: dict):
+        self._write(f"data: {json.dumps(payload)}\n\n".encode("utf-8"))
+
+    def _write(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _json(self, status: int, payload: dict):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_stub_server(port: int = 0, **options):
+    """
+    Starts the stub in a background thread; returns (server, base_url). Call server.shutdown() to stop.
+    """
+    handler = type("ConfiguredStubHandler", (StubHandler,), {"config": StubConfig(**options)})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI-compatible stub LLM server.")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds before the first token")
+    parser.add_argument("--tail-latency", type=float, default=0.0, help="First-token delay of slow requests")
+    parser.add_argument("--tail-rate", type=float, default=0.0, help="Fraction of slow requests")
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="Seconds between streamed chunks")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    args = parser.parse_args()
+
+    server, base_url = start_stub_server(
+        args.port, latency=args.latency, tail_latency=args.tail_latency, tail_rate=args.tail_rate,
+        chunk_delay=args.chunk_delay, error_rate=args.error_rate
+    )
+    print(f"Stub LLM listening on {base_url} (Ctrl+C to stop)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import os
+import re
+import subprocess
+import sys
+import argparse
+
+# Runs `python -X importtime -c "import <module>"` and reports the slowest imports.
+# Useful to check that heavy modules (torch, sentence_transformers, ...) stay out of the import path.
+
+LINE_RE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+def profile_imports(module: str):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=os.getcwd(),
+        env={**os.environ, "PYTHONPATH": os.getcwd()},
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        print(result.stderr.splitlines()[-1] if result.stderr else "Import failed")
+        return []
+
+    imports = []
+    for line in result.stderr.splitlines():
+        match = LINE_RE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            imports.append((name, int(self_us), int(cumulative_us), len(indent) // 2))
+    return imports
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time profile of the API process.")
+    parser.add_argument("--module", default="src.main", help="Module to import")
+    parser.add_argument("--top", type=int, default=20, help="Number of packages to show")
+    args = parser.parse_args()
+
+    imports = profile_imports(args.module)
+    if not imports:
+        return
+
+    total_us = next((cumulative for name, _, cumulative, _ in imports if name == args.module), 0)
+    print(f"Total import time for {args.module}: {total_us / 1000:.1f} ms")
+
+    # Attribute self time to root packages so nested imports aren't double counted
+    by_package = {}
+    for name, self_us, _, _ in imports:
+        package = name.split(".")[0]
+        by_package[package] = by_package.get(package, 0) + self_us
+
+    print(f"\n{'self (ms)':>10}  package")
+    for package, self_us in sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"{self_us / 1000:>10.1f}  {package}")
+
+    heavy = [name for name, *_ in imports if name.split(".")[0] in ("torch", "sentence_transformers", "transformers")]
+    if heavy:
+        print(f"\nWarning: heavy modules imported at startup: {sorted(set(m.split('.')[0] for m in heavy))}")
+
+if __name__ == "__main__":
+    main()
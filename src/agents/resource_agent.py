@@ -1,90 +1,363 @@
-from duckduckgo_search import DDGS
-from ..dependencies import get_qdrant_client, COLLECTION_NAME
+import asyncio
+import os
+from typing import Optional
+import numpy as np
+from ..cache import TTLCache, SQLiteCache, ResourceCache
+from ..circuit_breaker import CircuitBreaker, CircuitOpenError
+from ..embedding import BatchingEmbedder, load_sentence_encoder
+from ..lexical import BM25Index, reciprocal_rank_fusion
+from ..metrics import metrics
+from ..rerank import CrossEncoderReranker
+from ..retrieval import get_retrieval_backend
+from ..dependencies import (
+    CURATION_CONCURRENCY, NODE_DEADLINE, WEB_SPECULATION, RETRIEVAL_BACKEND, QDRANT_COLLECTION_PROFILE, LOCAL_INDEX_DIR, LOCAL_INDEX_HNSW,
+    LEXICAL_INDEX_DIR, BM25_MIN_COVERAGE,
+    RERANK_ENABLED, RERANK_MODEL, RERANK_CANDIDATES, RERANK_BUDGET_MS,
+    EMBEDDING_MODEL_NAME, EMBEDDING_BACKEND, ONNX_MODEL_DIR, ONNX_QUANTIZATION, EMBED_MAX_BATCH_SIZE, EMBED_MAX_WAIT_US,
+    QUERY_EMBEDDING_CACHE_SIZE, WEB_SEARCH_CACHE_PATH, WEB_SEARCH_CACHE_SIZE,
+    WEB_SEARCH_CACHE_TTL, WEB_SEARCH_CACHE_NEGATIVE_TTL, WEB_SEARCH_TIMEOUT, WEB_BROADEN_DELAY, WEB_BREAKER_FAILURES, WEB_BREAKER_RESET,
+    CORPUS_VERSION, CORPUS_VERSION_PATH, NODE_CACHE_SIZE, NODE_CACHE_LOCAL_TTL, NODE_CACHE_WEB_TTL, NODE_CACHE_PATH
+)
 from ..models import Resource
 
 class ResourceAgent:
-    def __init__(self):
-        self.qdrant_client = get_qdrant_client()
+    def __init__(self, web_cache_path: Optional[str] = WEB_SEARCH_CACHE_PATH):
+        # Qdrant server or the embedded in-process index
+        self.backend = get_retrieval_backend(
+            RETRIEVAL_BACKEND,
+            index_dir=LOCAL_INDEX_DIR,
+            use_hnsw=LOCAL_INDEX_HNSW,
+            profile=QDRANT_COLLECTION_PROFILE
+        )
+        # BM25 index for hybrid search (built by vectorize_corpus.py); dense-only if missing
+        self.lexical_index = BM25Index.load(LEXICAL_INDEX_DIR) if LEXICAL_INDEX_DIR and os.path.isdir(LEXICAL_INDEX_DIR) else None
+        # Optional cross-encoder stage over the over-fetched candidates
+        self.reranker = CrossEncoderReranker(RERANK_MODEL, budget_ms=RERANK_BUDGET_MS) if RERANK_ENABLED else None
         # Lazy load model
         self._model = None
+        # All encode calls in the process go through one micro-batching executor
+        self.embedder = BatchingEmbedder(
+            lambda: self.model,
+            max_batch_size=EMBED_MAX_BATCH_SIZE,
+            max_wait_us=EMBED_MAX_WAIT_US
+        )
+        # Node queries repeat across roadmaps; keep their embeddings (keyed by model and backend)
+        self.embedding_cache = TTLCache(max_size=QUERY_EMBEDDING_CACHE_SIZE)
+        self.embedding_key = f"{EMBEDDING_MODEL_NAME}/{EMBEDDING_BACKEND}"
+        from duckduckgo_search import DDGS
         self.ddgs = DDGS()
+        # Web searches are slow and rate-limited; remember them across requests and restarts
+        self.web_cache = SQLiteCache(
+            web_cache_path,
+            max_entries=WEB_SEARCH_CACHE_SIZE,
+            ttl=WEB_SEARCH_CACHE_TTL
+        ) if web_cache_path else None
+        # While DDG keeps failing, go straight to the search link instead of waiting on it
+        self.web_breaker = CircuitBreaker(failure_threshold=WEB_BREAKER_FAILURES, reset_timeout=WEB_BREAKER_RESET)
+        self.web_speculative = metrics.counter("web_search_speculative_total")
+        self.web_speculation_wasted = metrics.counter("web_search_speculation_wasted_total")
+        self.node_deadline_exceeded = metrics.counter("node_deadline_exceeded_total")
+        # Curated resources per node query, shared across roadmaps until the next reindex
+        self.resource_cache = ResourceCache(
+            CORPUS_VERSION,
+            version_path=CORPUS_VERSION_PATH,
+            max_size=NODE_CACHE_SIZE,
+            local_ttl=NODE_CACHE_LOCAL_TTL,
+            web_ttl=NODE_CACHE_WEB_TTL,
+            path=NODE_CACHE_PATH
+        )
 
     @property
     def model(self):
         if self._model is None:
-            from sentence_transformers import SentenceTransformer
-            self._model = SentenceTransformer("all-MiniLM-L6-v2")
+            self._model = load_sentence_encoder(
+                EMBEDDING_MODEL_NAME,
+                backend=EMBEDDING_BACKEND,
+                onnx_dir=ONNX_MODEL_DIR,
+                quantization=ONNX_QUANTIZATION
+            )
         return self._model
 
-    def find_resources(self, query: str, limit: int = 3) -> list[Resource]:
+    async def encode(self, texts: list[str]) -> np.ndarray:
+        """
+        Encodes texts off the event loop, batched together with concurrent callers.
+        Previously seen texts are served from the embedding cache.
+        """
+        vectors = [self.embedding_cache.get((self.embedding_key, text)) for text in texts]
+        missing = list(dict.fromkeys(text for text, vector in zip(texts, vectors) if vector is None))
+        if missing:
+            encoded = dict(zip(missing, await self.embedder.encode(missing)))
+            for text in missing:
+                vector = np.asarray(encoded[text], dtype=np.float32)
+                vector.flags.writeable = False
+                self.embedding_cache.set((self.embedding_key, text), vector)
+                encoded[text] = vector
+            vectors = [encoded[text] if vector is None else vector for text, vector in zip(texts, vectors)]
+        return np.vstack(vectors) if vectors else np.zeros((0, 0), dtype=np.float32)
+
+    async def find_resources(self, query: str, limit: int = 3) -> list[Resource]:
         """
         Finds resources using Qdrant (local) and falls back to Web Search if needed.
         """
-        resources = []
-        
-        # 1. Search Qdrant
+        return (await self.find_resources_batch([query], limit=limit))[0]
+
+    async def find_resources_batch(self, queries: list[str], limit: int = 3, max_concurrency: int = CURATION_CONCURRENCY,
+                                   semaphore: Optional[asyncio.Semaphore] = None) -> list[list[Resource]]:
+        """
+        Batched variant of find_resources.
+        Encodes all unique queries in one pass and issues a single batch search.
+        At most max_concurrency web fallbacks for under-served queries run at once
+        (or pass a semaphore to share that limit between several calls).
+        Returns one list of resources per input query, in input order.
+        """
+        results = [[] for _ in queries]
+        async for index, resources in self.iter_resources_batch(queries, limit=limit, max_concurrency=max_concurrency, semaphore=semaphore):
+            results[index] = resources
+        return results
+
+    async def iter_resources_batch(self, queries: list[str], limit: int = 3, max_concurrency: int = CURATION_CONCURRENCY,
+                                   semaphore: Optional[asyncio.Semaphore] = None):
+        """
+        Same retrieval as find_resources_batch, but yields (index, resources) pairs
+        as soon as each query is resolved instead of waiting for the slowest one.
+        """
+        indexes_by_query = {}
+        for index, query in enumerate(queries):
+            indexes_by_query.setdefault(query, []).append(index)
+
+        # Nodes seen in earlier roadmaps are served from the node cache
+        unique_queries = []
+        for query in indexes_by_query:
+            cached = self.resource_cache.get(query, limit)
+            if cached is None:
+                unique_queries.append(query)
+            else:
+                for index in indexes_by_query[query]:
+                    yield index, list(cached)
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + NODE_DEADLINE
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def web(query: str, max_results: int):
+            async with semaphore:
+                return await self.search_web(query, max_results)
+
+        # Few keyword matches usually means few dense matches too: start those web searches now
+        # instead of after the local search (the extra results are dropped if local is enough)
+        lexical_hits = None
+        speculative = {}
+        if unique_queries and self.lexical_index is not None:
+            lexical_hits = await asyncio.to_thread(self._lexical_search_batch, unique_queries, self._candidate_count(limit))
+            if WEB_SPECULATION:
+                for query, hits in zip(unique_queries, lexical_hits):
+                    if len(hits) < limit:
+                        self.web_speculative.inc()
+                        speculative[query] = asyncio.ensure_future(web(query, limit))
+
+        async def curate(query: str, resources: list[Resource]):
+            task = speculative.pop(query, None) or asyncio.ensure_future(web(query, limit - len(resources)))
+            try:
+                web_resources = await asyncio.wait_for(task, max(0.0, deadline - loop.time()))
+            except asyncio.TimeoutError:
+                self.node_deadline_exceeded.inc()
+                print(f"Deadline exceeded for '{query}'")
+                web_resources = [self._search_link(query, "Search took too long. Click to search on Google.")]
+            return query, resources + web_resources[:limit - len(resources)]
+
+        pending = []
         try:
-            query_vector = self.model.encode(query, convert_to_numpy=True).tolist()
-            search_results = self.qdrant_client.query_points(
-                collection_name=COLLECTION_NAME,
-                query=query_vector,
-                limit=limit,
-                with_payload=True,
-                score_threshold=0.4 # Only return relevant results
-            ).points
-            
-            for point in search_results:
-                payload = point.payload
-                resources.append(Resource(
-                    id=str(point.id),
-                    title=payload.get("title", "Unknown"),
-                    url=payload.get("url", "#"),
-                    description=payload.get("description", "")[:200] + "...",
-                    type=payload.get("content_type", "resource")
-                ))
+            local_results = await self.search_local_batch(unique_queries, limit=limit, lexical_hits=lexical_hits)
+
+            # Fallback/Augment with Web Search if we don't have enough results
+            for query, resources in zip(unique_queries, local_results):
+                if len(resources) >= limit:
+                    if query in speculative:
+                        self.web_speculation_wasted.inc()
+                        speculative.pop(query).cancel()
+                    self.resource_cache.set(query, limit, resources[:limit])
+                    for index in indexes_by_query[query]:
+                        yield index, list(resources[:limit])
+                else:
+                    pending.append(asyncio.ensure_future(curate(query, resources)))
+
+            for next_done in asyncio.as_completed(pending):
+                query, resources = await next_done
+                # Search links mean the web search failed or found nothing; retry those next time
+                if not any(resource.type == "Search Link" for resource in resources):
+                    self.resource_cache.set(query, limit, resources[:limit], from_web=True)
+                for index in indexes_by_query[query]:
+                    yield index, list(resources[:limit])
+        finally:
+            # Don't leave web searches running if the consumer stops early
+            for task in pending + list(speculative.values()):
+                task.cancel()
+
+    def _candidate_count(self, limit: int) -> int:
+        # Over-fetch when fusing or reranking so later stages have candidates to choose from
+        shortlist = max(limit, RERANK_CANDIDATES) if self.reranker is not None else limit
+        return shortlist * 2 if self.lexical_index is not None else shortlist
+
+    def _lexical_search_batch(self, queries: list[str], candidates: int):
+        return [self.lexical_index.search(query, candidates, BM25_MIN_COVERAGE) for query in queries]
+
+    async def search_local_batch(self, queries: list[str], limit: int = 3, lexical_hits=None) -> list[list[Resource]]:
+        """
+        Searches the local index for every query with one encode call and one batch search.
+        With a BM25 index available, dense and lexical results are merged by reciprocal rank fusion
+        (lexical_hits, if given, are BM25 results already computed for these queries).
+        With reranking enabled, RERANK_CANDIDATES hits per query are re-scored by the cross-encoder.
+        """
+        if not queries:
+            return []
+
+        try:
+            candidates = self._candidate_count(limit)
+            shortlist = candidates // 2 if self.lexical_index is not None else candidates
+
+            async def dense_search():
+                query_vectors = await self.encode(queries)
+                return await self.backend.search_batch(
+                    query_vectors,
+                    limit=candidates,
+                    score_threshold=0.4 # Only return relevant results
+                )
+
+            if self.lexical_index is None:
+                hits_per_query = await dense_search()
+            else:
+                if lexical_hits is None:
+                    dense, lexical = await asyncio.gather(
+                        dense_search(),
+                        asyncio.to_thread(self._lexical_search_batch, queries, candidates)
+                    )
+                else:
+                    dense, lexical = await dense_search(), lexical_hits
+                hits_per_query = [
+                    reciprocal_rank_fusion([dense_hits, lexical_hits], limit=shortlist)
+                    for dense_hits, lexical_hits in zip(dense, lexical)
+                ]
+
+            if self.reranker is not None:
+                hits_per_query = await self.reranker.rerank_batch(queries, hits_per_query, limit=limit)
+            else:
+                hits_per_query = [hits[:limit] for hits in hits_per_query]
+            return [[self._hit_to_resource(hit) for hit in hits] for hits in hits_per_query]
         except Exception as e:
-            print(f"Qdrant search failed: {e}")
+            print(f"Local search failed: {e}")
+            return [[] for _ in queries]
+
+    async def search_web(self, query: str, max_results: int) -> list[Resource]:
+        """
+        Web Search fallback for queries the local index cannot serve.
+        The specific search is preferred; the broadened one starts when it comes back empty,
+        or hedges it once it has been running for WEB_BROADEN_DELAY.
+        """
+        print(f"Not enough local resources for '{query}'. Searching web...")
+        specific = asyncio.ensure_future(self._web_text(f"{query} tutorial course", max_results))
+        broad = None
 
-        # 2. Fallback/Augment with Web Search if we don't have enough results
-        if len(resources) < limit:
-            print(f"Not enough local resources for '{query}'. Searching web...")
+        def start_broad():
+            task = asyncio.ensure_future(self._web_text(query, max_results))
+            # The loser's exception may never be awaited
+            task.add_done_callback(lambda done: done.cancelled() or done.exception())
+            return task
+
+        try:
+            done, _ = await asyncio.wait({specific}, timeout=WEB_BROADEN_DELAY)
+            if not done:
+                broad = start_broad()
             try:
-                web_results = self.ddgs.text(f"{query} tutorial course", max_results=limit - len(resources))
-                if not web_results:
-                    # Try broader search
-                    print(f"Broadening search for '{query}'...")
-                    web_results = self.ddgs.text(query, max_results=limit - len(resources))
-
-                if web_results:
-                    for res in web_results:
-                        resources.append(Resource(
-                            title=res.get("title", ""),
-                            url=res.get("href", ""),
-                            description=res.get("body", "")[:200] + "...",
-                            type="Web Resource"
-                        ))
-                else:
-                    # Last resort: Google Search Link
-                    import urllib.parse
-                    encoded_query = urllib.parse.quote(query)
-                    resources.append(Resource(
-                        title=f"Search Google for '{query}'",
-                        url=f"https://www.google.com/search?q={encoded_query}",
-                        description="No direct resources found. Click to search on Google.",
-                        type="Search Link"
-                    ))
+                web_results = await specific
+            except CircuitOpenError:
+                raise
             except Exception as e:
                 print(f"Web search failed: {e}")
-                # Last resort on error
-                import urllib.parse
-                encoded_query = urllib.parse.quote(query)
-                resources.append(Resource(
-                    title=f"Search Google for '{query}'",
-                    url=f"https://www.google.com/search?q={encoded_query}",
-                    description="Search failed. Click to search on Google.",
-                    type="Search Link"
-                ))
-                
-        return resources[:limit]
+                web_results = []
+            if not web_results:
+                # Try broader search
+                print(f"Broadening search for '{query}'...")
+                web_results = await (broad or start_broad())
+
+            if web_results:
+                return [
+                    Resource(
+                        title=res.get("title", ""),
+                        url=res.get("href", ""),
+                        description=res.get("body", "")[:200] + "...",
+                        type="Web Resource"
+                    )
+                    for res in web_results
+                ]
+            # Last resort: Google Search Link
+            return [self._search_link(query, "No direct resources found. Click to search on Google.")]
+        except CircuitOpenError:
+            return [self._search_link(query, "Web search is temporarily unavailable. Click to search on Google.")]
+        except Exception as e:
+            print(f"Web search failed: {e}")
+            # Last resort on error
+            return [self._search_link(query, "Search failed. Click to search on Google.")]
+        finally:
+            for task in (specific, broad):
+                if task is not None:
+                    task.cancel()
+
+    async def _web_text(self, search: str, max_results: int) -> list[dict]:
+        """
+        DDG text search through the persistent web cache and the circuit breaker.
+        Empty results are cached too (for a shorter time); errors are not cached.
+        """
+        key = f"{max_results}|{search}"
+        if self.web_cache is not None:
+            cached = self.web_cache.get(key)
+            if cached is not None:
+                return cached
+
+        if not self.web_breaker.allow():
+            raise CircuitOpenError("DDG circuit is open")
+        # DDGS is synchronous, so run it in a worker thread. The thread can't be stopped, so a
+        # caller that stops waiting (e.g. the specific search won) doesn't cancel the search:
+        # its outcome still goes to the breaker and its results to the cache.
+        task = asyncio.ensure_future(asyncio.wait_for(
+            asyncio.to_thread(self.ddgs.text, search, max_results=max_results),
+            WEB_SEARCH_TIMEOUT
+        ))
+        task.add_done_callback(lambda done: self._record_web_search(key, done))
+        return await asyncio.shield(task) or []
+
+    def _record_web_search(self, key: str, search: asyncio.Future):
+        if search.cancelled():
+            # Event loop shutting down, not a DDG failure; let a half-open trial be retried
+            self.web_breaker.release()
+            return
+        if search.exception() is not None:
+            self.web_breaker.record_failure()
+            return
+        self.web_breaker.record_success()
+        web_results = search.result() or []
+        if self.web_cache is not None:
+            self.web_cache.set(key, web_results, ttl=WEB_SEARCH_CACHE_TTL if web_results else WEB_SEARCH_CACHE_NEGATIVE_TTL)
 
+    @staticmethod
+    def _hit_to_resource(hit) -> Resource:
+        payload = hit.payload
+        return Resource(
+            id=hit.id,
+            title=payload.get("title", "Unknown"),
+            url=payload.get("url", "#"),
+            # Collections indexed before the snippet field existed only have the full description
+            description=payload.get("snippet", payload.get("description", "")[:200]) + "...",
+            type=payload.get("content_type", "resource")
+        )
 
+    @staticmethod
+    def _search_link(query: str, description: str) -> Resource:
+        import urllib.parse
+        encoded_query = urllib.parse.quote(query)
+        return Resource(
+            title=f"Search Google for '{query}'",
+            url=f"https://www.google.com/search?q={encoded_query}",
+            description=description,
+            type="Search Link"
+        )
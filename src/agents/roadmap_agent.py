@@ -1,15 +1,216 @@
-import json
-from ..dependencies import get_openai_client
+import asyncio
+import time
+from typing import Optional
+from ..json_stream import NodeStreamParser, has_nodes
+from ..llm_backend import LLMBackend
+from ..llm_cache import LLMResponseCache
+from ..metrics import metrics
+from ..dependencies import LLM_CACHE_MODE, LLM_CACHE_PATH, LLM_CACHE_TTL, LLM_CACHE_SIZE, PROMPT_PROFILE
+
+# Bump whenever the prompt or few-shot examples change
+PROMPT_VERSION = "1"
+
+# few_shot: system message, three worked examples, then the full instructions with the goal.
+# compact: all static instructions (one example node) in the system message and only the goal
+# in the user message. It cuts prompt tokens by about three quarters; the static prefix (~160
+# tokens) is far below the provider's prompt-caching minimum (1024 for OpenAI), so it isn't cached.
+PROMPT_PROFILES = ("few_shot", "compact")
+
+COMPACT_SYSTEM_PROMPT = """You are an expert curriculum designer. Create a learning roadmap for the goal (and stage, if one is given) in the user message.
+Return ONLY a JSON object {"nodes": [...]} with the nodes in learning order. Each node has:
+- "id": unique snake_case string id
+- "title": short display title
+- "description": brief explanation of what to learn, as a few key subtopics
+- "prerequisites": list of node ids that must be completed before this one
+Example node: {"id": "fundamentals", "title": "Fundamentals", "description": "JSX, Components, Props & State", "prerequisites": []}
+Ensure the roadmap is logical and covers the necessary steps."""
+
+TOKEN_BUCKETS = [100, 250, 500, 1000, 1500, 2000, 3000, 4000, 8000]
 
 class RoadmapAgent:
-    def __init__(self):
-        self.client = get_openai_client()
+    def __init__(self, prompt_profile: str = PROMPT_PROFILE, backend: LLMBackend = None,
+                 llm_cache_path: Optional[str] = LLM_CACHE_PATH):
+        if prompt_profile not in PROMPT_PROFILES:
+            raise ValueError(f"Unknown prompt profile '{prompt_profile}' (expected one of {', '.join(PROMPT_PROFILES)})")
+        self.prompt_profile = prompt_profile
+        # Token accounting from the usage the API reports with each completion
+        self.prompt_tokens = metrics.counter("llm_prompt_tokens_total")
+        self.cached_tokens = metrics.counter("llm_cached_prompt_tokens_total")
+        self.completion_tokens = metrics.counter("llm_completion_tokens_total")
+        self.prompt_tokens_per_call = metrics.histogram("llm_prompt_tokens", TOKEN_BUCKETS)
+        self.completion_tokens_per_call = metrics.histogram("llm_completion_tokens", TOKEN_BUCKETS)
+        self.first_token_latency = metrics.histogram("llm_first_token_seconds")
+        self.latency = metrics.histogram("llm_latency_seconds", [0.25, 0.5, 1, 2, 4, 8, 16, 32, 64])
+        # Replay mode runs fully offline, so the backend only creates its client when a call is made
+        self.backend = backend or LLMBackend()
+        # Identical requests (same model, prompt and goal) reuse the stored completion
+        self.llm_cache = LLMResponseCache(
+            llm_cache_path,
+            mode=LLM_CACHE_MODE,
+            ttl=LLM_CACHE_TTL,
+            max_entries=LLM_CACHE_SIZE
+        )
 
-    def generate_structure(self, goal: str) -> list:
+    async def generate_structure(self, goal: str, bypass_cache: bool = False) -> list:
         """
         Generates the DAG structure (nodes and prerequisites) for a given goal.
+        bypass_cache forces a fresh completion (which then replaces the cached one).
+        """
+        return [node async for node in self.stream_structure(goal, bypass_cache=bypass_cache)]
+
+    async def stream_structure(self, goal: str, bypass_cache: bool = False):
+        """
+        Streaming variant of generate_structure: yields each node dict as soon as
+        its JSON object is complete in the LLM output.
+        """
+        async for node in self._stream_nodes(self._roadmap_messages(goal), bypass_cache):
+            yield node
+
+    async def stream_hierarchical_structure(self, goal: str, bypass_cache: bool = False):
+        """
+        Two-level generation for broad goals. One call lists the top-level stages; each stage is
+        expanded into its own sub-roadmap as soon as it is parsed, all stages concurrently.
+        Nodes are yielded as they arrive from any stage, with ids namespaced as "<stage>/<node>"
+        and a "_position" (stage index, index within the stage) to restore roadmap order.
+
+        Cross-stage edges are only known once every stage is complete: before this generator
+        finishes, the yielded dicts are updated in place so that the first nodes of a stage
+        depend on the last nodes of each stage it depends on (dangling ids are dropped).
+        """
+        queue = asyncio.Queue()
+        stages = []
+        tasks = []
+
+        async def plan():
+            try:
+                async for stage in self._stream_nodes(self._stage_messages(goal), bypass_cache):
+                    stage_id = str(stage.get("id") or f"stage_{len(stages) + 1}")
+                    if any(existing["id"] == stage_id for existing in stages):
+                        stage_id = f"{stage_id}_{len(stages) + 1}"
+                    stage = {**stage, "id": stage_id, "index": len(stages), "nodes": []}
+                    stages.append(stage)
+                    tasks.append(asyncio.ensure_future(expand(stage)))
+                await queue.put(("planned", None))
+            except Exception as e:
+                await queue.put(("error", e))
+
+        async def expand(stage: dict):
+            try:
+                async for node in self._stream_nodes(self._roadmap_messages(goal, stage), bypass_cache):
+                    await queue.put(("node", _namespaced(stage, node)))
+            except Exception as e:
+                print(f"Expanding stage '{stage.get('title')}' failed: {e}")
+            await queue.put(("expanded", stage))
+
+        planner = asyncio.ensure_future(plan())
+        try:
+            planning, expanded = True, 0
+            while planning or expanded < len(tasks):
+                kind, item = await queue.get()
+                if kind == "error":
+                    raise item
+                if kind == "planned":
+                    planning = False
+                elif kind == "expanded":
+                    expanded += 1
+                    if not item["nodes"]:
+                        # Keep the stage itself rather than losing that part of the roadmap
+                        node = _namespaced(item, {key: item.get(key) or "" for key in ("id", "title", "description")})
+                        yield node
+                else:
+                    yield item
+            _link_stages(stages)
+        finally:
+            for task in [planner] + tasks:
+                task.cancel()
+
+    async def _stream_nodes(self, messages: list[dict], bypass_cache: bool):
+        parser = NodeStreamParser()
+        async for delta in self.llm_cache.stream(
+            self._create,
+            model=self.backend.model,
+            messages=messages,
+            response_format={"type": "json_object"},
+            bypass=bypass_cache,
+            validate=has_nodes
+        ):
+            for node in parser.feed(delta):
+                yield node
+
+    async def _create(self, **request):
+        start = time.perf_counter()
+        response = await self.backend.create(**request, stream_options={"include_usage": True})
+        return self._metered(response, start)
+
+    async def _metered(self, response, start: float):
+        """
+        Passes the stream through, recording latency and the token usage of the final chunk.
+        """
+        first = True
+        async for chunk in response:
+            if first:
+                self.first_token_latency.observe(time.perf_counter() - start)
+                first = False
+            usage = getattr(chunk, "usage", None)
+            if usage is not None:
+                self.record_usage(usage)
+            yield chunk
+        self.latency.observe(time.perf_counter() - start)
+
+    def record_usage(self, usage):
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached = (getattr(details, "cached_tokens", None) or 0) if details is not None else 0
+        self.prompt_tokens.inc(usage.prompt_tokens)
+        self.cached_tokens.inc(cached)
+        self.completion_tokens.inc(usage.completion_tokens)
+        self.prompt_tokens_per_call.observe(usage.prompt_tokens)
+        self.completion_tokens_per_call.observe(usage.completion_tokens)
+
+    def _roadmap_messages(self, goal: str, stage: dict = None) -> list[dict]:
+        if self.prompt_profile == "compact":
+            request = f'Goal: "{goal}"'
+            if stage is not None:
+                request += f'\nStage: "{stage.get("title")}" ({stage.get("description")}). Cover only this stage, in 3 to 6 nodes; other stages are planned separately.'
+            return [
+                {"role": "system", "content": COMPACT_SYSTEM_PROMPT},
+                {"role": "user", "content": request}
+            ]
+        prompt = self._goal_prompt(goal) if stage is None else self._stage_prompt(goal, stage)
+        return self._messages(prompt)
+
+    @staticmethod
+    def _stage_messages(goal: str) -> list[dict]:
+        return [
+            {"role": "system", "content": "You are an expert curriculum designer."},
+            {"role": "user", "content": f"""Break the goal "{goal}" into 3 to 6 top-level learning stages.
+Return a JSON object with a list of "nodes", one per stage, in learning order.
+Each node must have:
+- "id": unique string id (e.g., "frontend", "backend")
+- "title": short display title
+- "description": one sentence on what the stage covers
+- "prerequisites": list of stage ids that must be completed before this one
+
+Return ONLY valid JSON."""}
+        ]
+
+    @staticmethod
+    def _stage_prompt(goal: str, stage: dict) -> str:
+        return f"""
+        Create a learning roadmap for the stage "{stage.get('title')}" ({stage.get('description')}) of the goal: "{goal}".
+        Cover only this stage, in 3 to 6 nodes; other stages are planned separately.
+        Return a JSON object with a list of "nodes". 
+        Each node must have:
+        - "id": unique string id (e.g., "basics", "advanced_topic")
+        - "title": short display title
+        - "description": brief explanation of what to learn
+        - "prerequisites": list of node ids that must be completed before this one
+        
+        Return ONLY valid JSON.
         """
-        prompt = f"""
+
+    @staticmethod
+    def _goal_prompt(goal: str) -> str:
+        return f"""
         Create a learning roadmap for the goal: "{goal}".
         Return a JSON object with a list of "nodes". 
         Each node must have:
@@ -21,12 +222,12 @@ class RoadmapAgent:
         Ensure the roadmap is logical and covers the necessary steps.
         Return ONLY valid JSON.
         """
-        
-        response = self.client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": "You are an expert curriculum designer."},
-                {"role": "user", "content": """Create a learning roadmap for the goal: "React Development".
+
+    @staticmethod
+    def _messages(prompt: str) -> list[dict]:
+        return [
+            {"role": "system", "content": "You are an expert curriculum designer."},
+            {"role": "user", "content": """Create a learning roadmap for the goal: "React Development".
 Return a JSON object with a list of "nodes". 
 Each node must have:
 - "id": unique string id (e.g., "basics", "advanced_topic")
@@ -36,7 +237,7 @@ Each node must have:
 
 Ensure the roadmap is logical and covers the necessary steps.
 Return ONLY valid JSON."""},
-                {"role": "assistant", "content": """{
+            {"role": "assistant", "content": """{
   "nodes": [
     {
       "id": "fundamentals",
@@ -64,8 +265,8 @@ Return ONLY valid JSON."""},
     }
   ]
 }"""},
-                {"role": "user", "content": """Create a learning roadmap for the goal: "Sourdough Bread Baking"."""},
-                {"role": "assistant", "content": """{
+            {"role": "user", "content": """Create a learning roadmap for the goal: "Sourdough Bread Baking"."""},
+            {"role": "assistant", "content": """{
   "nodes": [
     {
       "id": "starter",
@@ -87,8 +288,8 @@ Return ONLY valid JSON."""},
     }
   ]
 }"""},
-                {"role": "user", "content": """Create a learning roadmap for the goal: "Agile Project Management"."""},
-                {"role": "assistant", "content": """{
+            {"role": "user", "content": """Create a learning roadmap for the goal: "Agile Project Management"."""},
+            {"role": "assistant", "content": """{
   "nodes": [
     {
       "id": "agile_manifesto",
@@ -110,14 +311,53 @@ Return ONLY valid JSON."""},
     }
   ]
 }"""},
-                {"role": "user", "content": prompt}
-            ],
-            response_format={"type": "json_object"}
-        )
-        
-        try:
-            dag_json = json.loads(response.choices[0].message.content)
-            return dag_json.get("nodes", [])
-        except json.JSONDecodeError:
-            print("Error decoding LLM response")
-            return []
+            {"role": "user", "content": prompt}
+        ]
+
+def _namespaced(stage: dict, node: dict) -> dict:
+    """
+    Copy of a sub-roadmap node with its id and in-stage prerequisites prefixed by the stage id.
+    The node is also recorded on the stage for _link_stages.
+    """
+    prefix = f"{stage['id']}/"
+    node = {
+        **node,
+        "id": prefix + str(node.get("id") or len(stage["nodes"]) + 1),
+        "prerequisites": [prefix + str(prerequisite) for prerequisite in node.get("prerequisites") or []],
+        "_position": (stage.get("index", 0), len(stage["nodes"]))
+    }
+    stage["nodes"].append(node)
+    return node
+
+def roadmap_order(nodes: list[dict]) -> list[int]:
+    """
+    Indexes of nodes in roadmap order: staged nodes by stage, then position within the stage
+    (they arrive interleaved); other nodes keep their order.
+    """
+    return sorted(range(len(nodes)), key=lambda i: nodes[i].get("_position", (0, i)))
+
+def _link_stages(stages: list[dict]):
+    """
+    Drops dangling prerequisites, then connects stages: every entry node of a stage
+    (no prerequisites within it) depends on every exit node (nothing depends on it)
+    of each prerequisite stage.
+    """
+    stage_ids = {stage["id"] for stage in stages}
+    node_ids = {node["id"] for stage in stages for node in stage["nodes"]}
+    exits = {}
+    for stage in stages:
+        for node in stage["nodes"]:
+            node["prerequisites"] = [p for p in dict.fromkeys(node["prerequisites"]) if p in node_ids and p != node["id"]]
+        required = {p for node in stage["nodes"] for p in node["prerequisites"]}
+        exits[stage["id"]] = [node["id"] for node in stage["nodes"] if node["id"] not in required]
+
+    for stage in stages:
+        upstream = [
+            exit_id
+            for stage_id in stage.get("prerequisites") or []
+            if stage_id in stage_ids and stage_id != stage["id"]
+            for exit_id in exits[stage_id]
+        ]
+        for node in stage["nodes"]:
+            if not node["prerequisites"]:
+                node["prerequisites"] = list(upstream)
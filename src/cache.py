@@ -0,0 +1,301 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+from .models import Resource, RoadmapResponse
+
+def normalize_goal(goal: str) -> str:
+    """
+    Normalizes a goal for cache keys: case, surrounding punctuation and whitespace are ignored.
+    """
+    goal = re.sub(r"\s+", " ", goal.lower()).strip()
+    return goal.strip(" .!?")
+
+class TTLCache:
+    """
+    Thread-safe in-memory LRU cache with a per-entry time-to-live.
+    """
+    def __init__(self, max_size: int = 1024, ttl: Optional[float] = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at < time.time():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.time() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0
+        }
+
+class SQLiteCache:
+    """
+    Persistent JSON key-value cache backed by sqlite, with TTL and least-recently-used eviction.
+    Survives restarts; meant as a second tier behind TTLCache.
+    Reads only query: access times are buffered and written with the next set() (or once
+    access_flush_size reads are pending), so a cache hit costs no write or fsync.
+    """
+    def __init__(self, path: str, max_entries: int = 10000, ttl: Optional[float] = None,
+                 access_flush_size: int = 256):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.access_flush_size = access_flush_size
+        self._accessed = {}
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            # In WAL mode NORMAL only syncs at checkpoints; a crash can lose the last writes, not corrupt
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL, accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_accessed ON cache(accessed_at)")
+            self._conn.commit()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return default
+            value, expires_at = row
+            if expires_at is not None and expires_at < now:
+                # Expired rows are dropped by the next set()
+                return default
+            self._accessed[key] = now
+            if len(self._accessed) >= self.access_flush_size:
+                self._flush_access()
+                self._conn.commit()
+        return json.loads(value)
+
+    def _flush_access(self):
+        # Caller holds the lock and commits
+        if self._accessed:
+            self._conn.executemany(
+                "UPDATE cache SET accessed_at = ? WHERE key = ?",
+                [(accessed_at, key) for key, accessed_at in self._accessed.items()]
+            )
+            self._accessed.clear()
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        ttl = self.ttl if ttl is None else ttl
+        now = time.time()
+        expires_at = now + ttl if ttl else None
+        with self._lock:
+            # Pending reads count for the LRU order before anything is evicted
+            self._flush_access()
+            self._accessed.pop(key, None)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), expires_at, now)
+            )
+            # Drop expired rows, then the least recently used ones beyond max_entries
+            self._conn.execute("DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at < ?", (now,))
+            self._conn.execute(
+                "DELETE FROM cache WHERE key IN ("
+                "SELECT key FROM cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+            self._conn.commit()
+
+    def delete(self, key: str):
+        with self._lock:
+            self._accessed.pop(key, None)
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._accessed.clear()
+            self._conn.execute("DELETE FROM cache")
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._flush_access()
+            self._conn.commit()
+            self._conn.close()
+
+class RoadmapCache:
+    """
+    Goal-level cache of generated roadmaps.
+    Keys combine the normalized goal with the LLM model, prompt version and corpus version,
+    so changing any of them naturally misses. Memory tier is always on; the sqlite tier is optional.
+    """
+    def __init__(self, model: str, prompt_version: str, corpus_version: str,
+                 max_size: int = 512, ttl: Optional[float] = None, path: Optional[str] = None):
+        self.model = model
+        self.prompt_version = prompt_version
+        self.corpus_version = corpus_version
+        self.ttl = ttl
+        self.memory = TTLCache(max_size=max_size, ttl=ttl)
+        self.disk = SQLiteCache(path, ttl=ttl) if path else None
+
+    def make_key(self, goal: str) -> str:
+        return "|".join([self.model, self.prompt_version, self.corpus_version, normalize_goal(goal)])
+
+    def get(self, goal: str) -> Optional[RoadmapResponse]:
+        key = self.make_key(goal)
+        roadmap = self.memory.get(key)
+        if roadmap is None and self.disk is not None:
+            data = self.disk.get(key)
+            # Rows written before expires_at was stored are treated as misses and rewritten
+            if data is not None and "roadmap" in data:
+                roadmap = RoadmapResponse.model_validate(data["roadmap"])
+                # Promote to the memory tier for the rest of the entry's lifetime
+                remaining = max(data["expires_at"] - time.time(), 1e-3) if data["expires_at"] else None
+                self.memory.set(key, roadmap, ttl=remaining)
+        if roadmap is None:
+            return None
+        # Echo the caller's wording of the goal
+        return roadmap.model_copy(update={"goal": goal})
+
+    def set(self, goal: str, roadmap: RoadmapResponse, ttl: Optional[float] = None):
+        """
+        Stores the roadmap for ttl seconds (default: the cache's TTL).
+        """
+        key = self.make_key(goal)
+        ttl = self.ttl if ttl is None else ttl
+        self.memory.set(key, roadmap, ttl=ttl)
+        if self.disk is not None:
+            self.disk.set(key, {
+                "roadmap": roadmap.model_dump(),
+                "expires_at": time.time() + ttl if ttl else None
+            }, ttl=ttl)
+
+    def stats(self) -> dict:
+        return self.memory.stats()
+
+def read_corpus_version(path: Optional[str]) -> str:
+    """
+    Index version written by vectorize_corpus.py; empty if the marker file doesn't exist.
+    """
+    if not path:
+        return ""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return ""
+
+def write_corpus_version(path: str) -> str:
+    """
+    Stamps a new index version (called after every reindex), invalidating version-keyed caches.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    version = f"{time.time_ns():x}"
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(version)
+    return version
+
+class ResourceCache:
+    """
+    Node-level cache of curated resources, shared across roadmaps ("Python Basics" shows up in many).
+    Keys combine the normalized node query and result limit with the corpus version: the configured
+    CORPUS_VERSION plus the marker vectorize_corpus.py rewrites on every reindex, so a reindex
+    misses without a restart. Results that needed the web fallback get their own (shorter) TTL.
+    """
+    def __init__(self, corpus_version: str, version_path: Optional[str] = None, max_size: int = 4096,
+                 local_ttl: Optional[float] = None, web_ttl: Optional[float] = None, path: Optional[str] = None):
+        self.corpus_version = corpus_version
+        self.version_path = version_path
+        self.local_ttl = local_ttl
+        self.web_ttl = web_ttl
+        self.memory = TTLCache(max_size=max_size)
+        self.disk = SQLiteCache(path, max_entries=max_size) if path else None
+        self._marker_mtime = None
+        self._marker = ""
+
+    def version(self) -> str:
+        # Re-read the marker only when it changes; a stat per lookup is cheap
+        try:
+            mtime = os.stat(self.version_path).st_mtime_ns if self.version_path else None
+        except FileNotFoundError:
+            mtime = None
+        if mtime != self._marker_mtime:
+            self._marker = read_corpus_version(self.version_path)
+            self._marker_mtime = mtime
+        return f"{self.corpus_version}:{self._marker}"
+
+    def make_key(self, query: str, limit: int) -> str:
+        return "|".join([self.version(), str(limit), normalize_goal(query)])
+
+    def get(self, query: str, limit: int) -> Optional[list[Resource]]:
+        key = self.make_key(query, limit)
+        resources = self.memory.get(key)
+        if resources is None and self.disk is not None:
+            data = self.disk.get(key)
+            if data is not None:
+                resources = [Resource.model_validate(item) for item in data["resources"]]
+                # Promote to the memory tier for the rest of the entry's lifetime
+                remaining = max(data["expires_at"] - time.time(), 1e-3) if data["expires_at"] else None
+                self.memory.set(key, resources, ttl=remaining)
+        return None if resources is None else list(resources)
+
+    def set(self, query: str, limit: int, resources: list[Resource], from_web: bool = False):
+        key = self.make_key(query, limit)
+        ttl = self.web_ttl if from_web else self.local_ttl
+        self.memory.set(key, list(resources), ttl=ttl)
+        if self.disk is not None:
+            self.disk.set(key, {
+                "resources": [resource.model_dump() for resource in resources],
+                "expires_at": time.time() + ttl if ttl else None
+            }, ttl=ttl)
+
+    def stats(self) -> dict:
+        return self.memory.stats()
@@ -0,0 +1,93 @@
+from qdrant_client import models
+
+# Qdrant collection profiles applied by vectorize_corpus.py (and matched at query time through
+# QDRANT_COLLECTION_PROFILE). Plain values here; build_* functions turn them into qdrant models.
+#
+#   quantization  - None, "scalar" (int8, ~4x smaller) or "binary" (~32x smaller, needs more oversampling)
+#   oversampling  - candidates fetched per result from the quantized index before full-vector rescoring
+#   on_disk       - keep original vectors on disk (mmapped); quantized vectors stay in RAM
+PROFILES = {
+    "default": {
+        "hnsw_m": 16,
+        "hnsw_ef_construct": 100,
+        "hnsw_ef": None,
+        "quantization": None,
+        "oversampling": None,
+        "on_disk": False,
+        "on_disk_payload": False,
+    },
+    "balanced": {
+        "hnsw_m": 16,
+        "hnsw_ef_construct": 200,
+        "hnsw_ef": 128,
+        "quantization": "scalar",
+        "oversampling": 2.0,
+        "on_disk": True,
+        "on_disk_payload": True,
+    },
+    "low_memory": {
+        "hnsw_m": 16,
+        "hnsw_ef_construct": 128,
+        "hnsw_ef": 128,
+        "quantization": "binary",
+        "oversampling": 3.0,
+        "on_disk": True,
+        "on_disk_payload": True,
+    },
+}
+
+# Payload fields with an index, for filtered search
+PAYLOAD_INDEXES = {
+    "source": models.PayloadSchemaType.KEYWORD,
+    "content_type": models.PayloadSchemaType.KEYWORD,
+    "quality_score": models.PayloadSchemaType.FLOAT,
+}
+
+# The only payload fields the API needs; "snippet" is precomputed at ingestion
+QUERY_PAYLOAD_FIELDS = ["title", "url", "snippet", "content_type"]
+SNIPPET_LENGTH = 200
+
+def get_profile(name: str) -> dict:
+    if name not in PROFILES:
+        raise ValueError(f"Unknown collection profile '{name}' (expected one of {', '.join(PROFILES)})")
+    return PROFILES[name]
+
+def build_collection_config(profile: dict, vector_size: int = 384) -> dict:
+    """
+    Keyword arguments for QdrantClient.create_collection.
+    """
+    quantization_config = None
+    if profile["quantization"] == "scalar":
+        quantization_config = models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(type=models.ScalarType.INT8, quantile=0.99, always_ram=True)
+        )
+    elif profile["quantization"] == "binary":
+        quantization_config = models.BinaryQuantization(
+            binary=models.BinaryQuantizationConfig(always_ram=True)
+        )
+
+    return {
+        "vectors_config": models.VectorParams(
+            size=vector_size,
+            distance=models.Distance.COSINE,
+            on_disk=profile["on_disk"],
+        ),
+        "hnsw_config": models.HnswConfigDiff(m=profile["hnsw_m"], ef_construct=profile["hnsw_ef_construct"]),
+        "quantization_config": quantization_config,
+        "on_disk_payload": profile["on_disk_payload"],
+    }
+
+def build_search_params(profile: dict):
+    """
+    Query-time parameters matching the profile, or None to use the server defaults.
+    """
+    quantization = None
+    if profile["quantization"]:
+        quantization = models.QuantizationSearchParams(rescore=True, oversampling=profile["oversampling"])
+    if quantization is None and profile["hnsw_ef"] is None:
+        return None
+    return models.SearchParams(hnsw_ef=profile["hnsw_ef"], quantization=quantization)
+
+def create_payload_indexes(client, collection_name: str):
+    for field, schema in PAYLOAD_INDEXES.items():
+        client.create_payload_index(collection_name=collection_name, field_name=field, field_schema=schema)
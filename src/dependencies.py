@@ -1,6 +1,5 @@
 import os
-from qdrant_client import QdrantClient
-from openai import OpenAI
+import threading
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -8,13 +7,220 @@ load_dotenv()
 # Qdrant Setup
 QDRANT_URL = os.getenv("QDRANT_URL", "http://localhost:6333")
 COLLECTION_NAME = "educational_resources"
+# Collection profile (see src/collection_profiles.py); must match the one used by vectorize_corpus.py
+QDRANT_COLLECTION_PROFILE = os.getenv("QDRANT_COLLECTION_PROFILE", "default")
+
+# Retrieval Setup
+# "qdrant" (server) or "embedded" (memory-mapped index built by vectorize_corpus.py --local-index-dir)
+RETRIEVAL_BACKEND = os.getenv("RETRIEVAL_BACKEND", "qdrant")
+LOCAL_INDEX_DIR = os.getenv("LOCAL_INDEX_DIR", os.path.join("data", "index"))
+LOCAL_INDEX_HNSW = os.getenv("LOCAL_INDEX_HNSW", "0") == "1"
+# BM25 index for hybrid (lexical + dense) search; used when the directory exists
+LEXICAL_INDEX_DIR = os.getenv("LEXICAL_INDEX_DIR", os.path.join("data", "index", "bm25"))
+# Fraction of distinct query terms a document must contain to be a BM25 match
+BM25_MIN_COVERAGE = float(os.getenv("BM25_MIN_COVERAGE", "0.5"))
+# Optional cross-encoder rerank of the top RERANK_CANDIDATES hits per node
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "0") == "1"
+RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "10"))
+# Per-request rerank budget; retrieval order is kept when it is exceeded
+RERANK_BUDGET_MS = float(os.getenv("RERANK_BUDGET_MS", "300"))
+
+# Orchestrator Setup
+# Maximum number of nodes curated concurrently (web fallbacks are I/O bound)
+CURATION_CONCURRENCY = int(os.getenv("CURATION_CONCURRENCY", "8"))
+# Nodes the LLM produces within this window are curated with one batched search (and rerank pass)
+CURATION_BATCH_WINDOW_MS = float(os.getenv("CURATION_BATCH_WINDOW_MS", "20"))
+# Two-level generation: list top-level stages first, then expand every stage concurrently
+HIERARCHICAL_GENERATION = os.getenv("HIERARCHICAL_GENERATION", "0") == "1"
+# Hard limit (seconds) on resolving one node, web fallback included; late nodes get a search link
+NODE_DEADLINE = float(os.getenv("NODE_DEADLINE", "8"))
+# Start web searches alongside the local search for queries with too few BM25 matches
+WEB_SPECULATION = os.getenv("WEB_SPECULATION", "1") == "1"
+
+# Embedding Setup
+EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+# "torch", "onnx" or "onnx-int8" (export with scripts/export_onnx_encoder.py)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR", os.path.join("data", "models", "all-MiniLM-L6-v2-onnx"))
+# Instruction set the int8 model was quantized for: avx2, avx512, avx512_vnni or arm64
+ONNX_QUANTIZATION = os.getenv("ONNX_QUANTIZATION", "avx2")
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "4096"))
+# Encode calls from concurrent requests are merged for up to EMBED_MAX_WAIT_US microseconds
+EMBED_MAX_BATCH_SIZE = int(os.getenv("EMBED_MAX_BATCH_SIZE", "64"))
+EMBED_MAX_WAIT_US = int(os.getenv("EMBED_MAX_WAIT_US", "2000"))
+
+# Web Search Setup
+# sqlite cache of DuckDuckGo results (empty path disables it)
+WEB_SEARCH_CACHE_PATH = os.getenv("WEB_SEARCH_CACHE_PATH", os.path.join("data", "cache", "web_search.sqlite"))
+WEB_SEARCH_CACHE_SIZE = int(os.getenv("WEB_SEARCH_CACHE_SIZE", "20000"))
+WEB_SEARCH_CACHE_TTL = float(os.getenv("WEB_SEARCH_CACHE_TTL", str(7 * 24 * 3600)))
+# Empty results are retried sooner
+WEB_SEARCH_CACHE_NEGATIVE_TTL = float(os.getenv("WEB_SEARCH_CACHE_NEGATIVE_TTL", str(6 * 3600)))
+WEB_SEARCH_TIMEOUT = float(os.getenv("WEB_SEARCH_TIMEOUT", "5"))
+# The broadened web search only starts if the specific one is empty or still running after this many seconds
+WEB_BROADEN_DELAY = float(os.getenv("WEB_BROADEN_DELAY", "1"))
+# After this many consecutive DDG failures, skip web search for WEB_BREAKER_RESET seconds
+WEB_BREAKER_FAILURES = int(os.getenv("WEB_BREAKER_FAILURES", "5"))
+WEB_BREAKER_RESET = float(os.getenv("WEB_BREAKER_RESET", "60"))
+
+# Roadmap Cache Setup
+# Bump CORPUS_VERSION after re-ingesting so cached roadmaps pick up the new resources
+CORPUS_VERSION = os.getenv("CORPUS_VERSION", "1")
+ROADMAP_CACHE_SIZE = int(os.getenv("ROADMAP_CACHE_SIZE", "512"))
+ROADMAP_CACHE_TTL = float(os.getenv("ROADMAP_CACHE_TTL", str(24 * 3600)))
+# Path to a sqlite file for the persistent tier; unset keeps the cache in memory only
+ROADMAP_CACHE_PATH = os.getenv("ROADMAP_CACHE_PATH")
+# Cosine similarity above which a previously generated goal is reused (set to 1.0 to disable)
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.85"))
+SEMANTIC_CACHE_SIZE = int(os.getenv("SEMANTIC_CACHE_SIZE", "1024"))
+
+# LLM Backend Setup
+# Any OpenAI-compatible server (OpenAI, vLLM, Ollama, scripts/llm_stub_server.py); unset uses api.openai.com
+LLM_BASE_URL = os.getenv("LLM_BASE_URL") or None
+LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4o")
+# Per-attempt limit (seconds) on the time to the first streamed token; failed attempts are retried with jitter
+LLM_ATTEMPT_TIMEOUT = float(os.getenv("LLM_ATTEMPT_TIMEOUT", "20"))
+# Non-streamed requests have no first token to wait for: this limits the whole completion instead
+LLM_REQUEST_TIMEOUT = float(os.getenv("LLM_REQUEST_TIMEOUT", "180"))
+LLM_MAX_ATTEMPTS = int(os.getenv("LLM_MAX_ATTEMPTS", "3"))
+LLM_BACKOFF = float(os.getenv("LLM_BACKOFF", "0.5"))
+# Send a second request when the first is slower than this quantile of recent attempts (costs extra tokens)
+LLM_HEDGE = os.getenv("LLM_HEDGE", "0") == "1"
+LLM_HEDGE_QUANTILE = float(os.getenv("LLM_HEDGE_QUANTILE", "0.95"))
+
+# Prompt for roadmap generation: few_shot (three worked examples) or compact (instructions only, fewer tokens)
+PROMPT_PROFILE = os.getenv("PROMPT_PROFILE", "few_shot")
+
+# LLM Response Cache Setup
+# cache (default), record, replay (offline, misses fail) or off; see src/llm_cache.py
+LLM_CACHE_MODE = os.getenv("LLM_CACHE_MODE", "cache")
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join("data", "cache", "llm_responses.sqlite"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(30 * 24 * 3600)))
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "5000"))
+
+# Node Resource Cache Setup
+# Marker rewritten by vectorize_corpus.py on every reindex; cached node resources are keyed on it
+CORPUS_VERSION_PATH = os.getenv("CORPUS_VERSION_PATH", os.path.join("data", "index", "corpus_version"))
+NODE_CACHE_SIZE = int(os.getenv("NODE_CACHE_SIZE", "4096"))
+NODE_CACHE_LOCAL_TTL = float(os.getenv("NODE_CACHE_LOCAL_TTL", str(7 * 24 * 3600)))
+NODE_CACHE_WEB_TTL = float(os.getenv("NODE_CACHE_WEB_TTL", str(24 * 3600)))
+# Path to a sqlite file for the persistent tier; unset keeps the cache in memory only
+NODE_CACHE_PATH = os.getenv("NODE_CACHE_PATH")
+
+# Evaluation Setup
+# JSONL file that background evaluation results are appended to (empty to only log them)
+EVAL_RESULTS_PATH = os.getenv("EVAL_RESULTS_PATH", os.path.join("data", "evaluation", "online_results.jsonl"))
+
+# Client Setup
+# Clients are created once per process and shared (connection pools, keep-alive); see close_clients()
+QDRANT_PREFER_GRPC = os.getenv("QDRANT_PREFER_GRPC", "0") == "1"
+QDRANT_GRPC_PORT = int(os.getenv("QDRANT_GRPC_PORT", "6334"))
+QDRANT_TIMEOUT = int(os.getenv("QDRANT_TIMEOUT", "10"))
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "60"))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "2"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "64"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+
+# Client libraries are imported on first use to keep `import src.main` fast
+_clients = {}
+_clients_lock = threading.Lock()
+
+def _shared_client(name: str, factory):
+    client = _clients.get(name)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(name)
+            if client is None:
+                client = _clients[name] = factory()
+    return client
+
+def _http_limits(httpx):
+    return httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_CONNECTIONS,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+    )
+
+def _qdrant_client_kwargs() -> dict:
+    import httpx
+    return {
+        "url": QDRANT_URL,
+        "timeout": QDRANT_TIMEOUT,
+        "prefer_grpc": QDRANT_PREFER_GRPC,
+        "grpc_port": QDRANT_GRPC_PORT,
+        # Keep idle gRPC channels alive instead of reconnecting after a quiet period
+        "grpc_options": {"grpc.keepalive_time_ms": int(HTTP_KEEPALIVE_EXPIRY * 1000)},
+        # The async REST client disables keep-alive unless limits are given
+        "limits": _http_limits(httpx),
+    }
 
 def get_qdrant_client():
-    return QdrantClient(url=QDRANT_URL)
+    def create():
+        from qdrant_client import QdrantClient
+        return QdrantClient(**_qdrant_client_kwargs())
+    return _shared_client("qdrant", create)
+
+def get_async_qdrant_client():
+    """
+    Shared async client. Like all async clients, it must be used from a single event loop.
+    """
+    def create():
+        from qdrant_client import AsyncQdrantClient
+        return AsyncQdrantClient(**_qdrant_client_kwargs())
+    return _shared_client("async_qdrant", create)
 
 # OpenAI Setup
-def get_openai_client():
+def _get_openai_api_key(base_url=None):
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
+        if base_url:
+            # Local servers usually ignore the key but the SDK requires one
+            return "unused"
         raise ValueError("OPENAI_API_KEY environment variable is not set")
-    return OpenAI(api_key=api_key)
+    return api_key
+
+def _openai_client_kwargs(http_client_class, base_url=LLM_BASE_URL, api_key=None) -> dict:
+    import httpx
+    import openai
+    # httpx.Limits also configures the httpx fork recent openai releases bundle (it only reads the fields)
+    timeout = openai.Timeout(OPENAI_TIMEOUT, connect=5.0)
+    return {
+        "api_key": api_key or _get_openai_api_key(base_url),
+        "base_url": base_url,
+        "timeout": timeout,
+        "max_retries": OPENAI_MAX_RETRIES,
+        "http_client": http_client_class(limits=_http_limits(httpx), timeout=timeout),
+    }
+
+def get_openai_client():
+    def create():
+        from openai import OpenAI, DefaultHttpxClient
+        return OpenAI(**_openai_client_kwargs(DefaultHttpxClient))
+    return _shared_client("openai", create)
+
+def create_async_openai_client(base_url=LLM_BASE_URL, api_key=None):
+    """
+    New (unshared) pooled async client, e.g. for a script pointed at another server.
+    """
+    from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+    return AsyncOpenAI(**_openai_client_kwargs(DefaultAsyncHttpxClient, base_url, api_key))
+
+def get_async_openai_client():
+    return _shared_client("async_openai", create_async_openai_client)
+
+async def close_clients():
+    """
+    Closes every shared client (call on shutdown); the next get_* call creates a fresh one.
+    """
+    import inspect
+    with _clients_lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        try:
+            result = client.close()
+            if inspect.isawaitable(result):
+                await result
+        except Exception as e:
+            print(f"Failed to close {type(client).__name__}: {e}")
@@ -0,0 +1,124 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+import numpy as np
+from .metrics import metrics
+
+# Encoder backends: PyTorch (default), ONNX Runtime fp32, ONNX Runtime dynamic int8
+ENCODER_BACKENDS = ("torch", "onnx", "onnx-int8")
+
+def onnx_file_name(backend: str, quantization: str = "avx2") -> str:
+    return "onnx/model.onnx" if backend == "onnx" else f"onnx/model_qint8_{quantization}.onnx"
+
+def load_sentence_encoder(model_name: str, backend: str = "torch", onnx_dir: str = None, quantization: str = "avx2"):
+    """
+    Loads a SentenceTransformer with the requested backend. All backends expose the same encode().
+    ONNX models are read from onnx_dir (see scripts/export_onnx_encoder.py) if it exists,
+    otherwise from the model's hub repository.
+    """
+    from sentence_transformers import SentenceTransformer
+
+    if backend == "torch":
+        return SentenceTransformer(model_name)
+    if backend not in ENCODER_BACKENDS:
+        raise ValueError(f"Unknown encoder backend '{backend}' (expected one of {', '.join(ENCODER_BACKENDS)})")
+
+    path = onnx_dir if onnx_dir and os.path.isdir(onnx_dir) else model_name
+    return SentenceTransformer(
+        path,
+        backend="onnx",
+        model_kwargs={"file_name": onnx_file_name(backend, quantization)}
+    )
+
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128, 256]
+QUEUE_WAIT_BUCKETS_US = [50, 100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000]
+
+class _Request:
+    __slots__ = ("texts", "future", "enqueued")
+
+    def __init__(self, texts: list[str], future: asyncio.Future):
+        self.texts = texts
+        self.future = future
+        self.enqueued = time.perf_counter()
+
+class BatchingEmbedder:
+    """
+    Dynamic micro-batching in front of a sentence-transformer.
+    Encode requests from all in-flight requests are collected for up to max_wait_us
+    (or until max_batch_size texts are queued) and run as one forward pass on a
+    single dedicated thread, so concurrent requests don't fight over torch threads.
+    """
+    def __init__(self, get_model: Callable, max_batch_size: int = 64, max_wait_us: int = 2000):
+        self.get_model = get_model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_us / 1e6
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embedder")
+        self._loop = None
+        self._queue = None
+        self._worker = None
+        self.batch_sizes = metrics.histogram("embedding_batch_size", BATCH_SIZE_BUCKETS)
+        self.queue_wait = metrics.histogram("embedding_queue_wait_us", QUEUE_WAIT_BUCKETS_US)
+
+    async def encode(self, texts: list[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        self._ensure_worker()
+        future = self._loop.create_future()
+        self._queue.put_nowait(_Request(list(texts), future))
+        return await future
+
+    def _ensure_worker(self):
+        # The queue and worker belong to the loop that first used them
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+    async def _collect(self) -> list[_Request]:
+        batch = [await self._queue.get()]
+        size = len(batch[0].texts)
+        deadline = self._loop.time() + self.max_wait
+        while size < self.max_batch_size:
+            timeout = deadline - self._loop.time()
+            if timeout <= 0:
+                break
+            try:
+                request = await asyncio.wait_for(self._queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            batch.append(request)
+            size += len(request.texts)
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            batch = [request for request in batch if not request.future.done()]
+            if not batch:
+                continue
+
+            now = time.perf_counter()
+            for request in batch:
+                self.queue_wait.observe((now - request.enqueued) * 1e6)
+
+            # Identical texts across requests are encoded once
+            unique_texts = list(dict.fromkeys(text for request in batch for text in request.texts))
+            self.batch_sizes.observe(len(unique_texts))
+            try:
+                vectors = await self._loop.run_in_executor(
+                    self._executor,
+                    lambda: self.get_model().encode(unique_texts, convert_to_numpy=True)
+                )
+            except Exception as e:
+                for request in batch:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+                continue
+
+            positions = {text: i for i, text in enumerate(unique_texts)}
+            for request in batch:
+                if not request.future.done():
+                    request.future.set_result(vectors[[positions[text] for text in request.texts]])
@@ -0,0 +1,73 @@
+import asyncio
+import json
+import os
+from datetime import datetime, timezone
+from typing import Optional
+from .agents.eval_agent import EvaluationAgent
+from .models import RoadmapResponse
+
+class EvaluationPipeline:
+    """
+    Runs roadmap evaluation off the request path.
+    Roadmaps are queued by the orchestrator and evaluated by a background worker;
+    each result is appended with a timestamp to a JSONL sink for later aggregation.
+    """
+    def __init__(self, eval_agent: EvaluationAgent, sink_path: Optional[str], max_queue: int = 1000):
+        self.eval_agent = eval_agent
+        self.sink_path = sink_path
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self._worker = None
+
+    def submit(self, roadmap: RoadmapResponse):
+        """
+        Queues a roadmap for evaluation without waiting. Drops it if the queue is full.
+        """
+        if self._worker is None or self._worker.done():
+            self.start()
+        try:
+            self.queue.put_nowait(roadmap)
+        except asyncio.QueueFull:
+            print(f"Evaluation queue full, skipping '{roadmap.goal}'")
+
+    def start(self):
+        self._worker = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        """
+        Waits for queued evaluations to finish, then stops the worker.
+        """
+        if self._worker is None:
+            return
+        await self.queue.join()
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+
+    async def _run(self):
+        while True:
+            roadmap = await self.queue.get()
+            try:
+                # Metrics may be CPU heavy, keep them off the event loop
+                result = await asyncio.to_thread(self.eval_agent.evaluate, roadmap)
+                await asyncio.to_thread(self._write, {
+                    "timestamp": datetime.now(timezone.utc).isoformat(),
+                    "goal": roadmap.goal,
+                    "evaluation": result
+                })
+            except Exception as e:
+                print(f"Evaluation failed for '{roadmap.goal}': {e}")
+            finally:
+                self.queue.task_done()
+
+    def _write(self, record: dict):
+        print(f"Evaluation Result: {record['evaluation']}")
+        if not self.sink_path:
+            return
+        directory = os.path.dirname(self.sink_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.sink_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
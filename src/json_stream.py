@@ -0,0 +1,81 @@
+import json
+
+class NodeStreamParser:
+    """
+    Incremental parser for LLM output of the form {"nodes": [{...}, {...}]}.
+    feed() takes raw text chunks as they stream in and returns the node objects
+    that closed in that chunk, so work on a node can start before the JSON is complete.
+    Only objects directly inside the top-level "nodes" array are returned.
+    """
+    def __init__(self, key: str = "nodes"):
+        self.key = key
+        self.buffer = ""
+        self.pos = 0
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.string_start = None
+        self.last_key = None
+        self.array_depth = None   # depth inside the "nodes" array, once entered
+        self.object_start = None  # buffer index of the node object being read
+
+    def feed(self, chunk: str) -> list[dict]:
+        self.buffer += chunk
+        nodes = []
+        while self.pos < len(self.buffer):
+            char = self.buffer[self.pos]
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+                    if self.depth == 1:
+                        # Strings at the top level of the root object are its keys (or string values)
+                        self.last_key = self.buffer[self.string_start + 1:self.pos]
+            elif char == '"':
+                self.in_string = True
+                self.string_start = self.pos
+            elif char in "{[":
+                self.depth += 1
+                if char == "[" and self.depth == 2 and self.last_key == self.key:
+                    self.array_depth = self.depth
+                elif char == "{" and self.array_depth is not None and self.depth == self.array_depth + 1:
+                    self.object_start = self.pos
+            elif char in "}]":
+                if char == "}" and self.object_start is not None and self.depth == self.array_depth + 1:
+                    node = self._parse(self.buffer[self.object_start:self.pos + 1])
+                    if node is not None:
+                        nodes.append(node)
+                    self.object_start = None
+                elif char == "]" and self.depth == self.array_depth:
+                    self.array_depth = None
+                self.depth -= 1
+            self.pos += 1
+        return nodes
+
+    @staticmethod
+    def _parse(text: str):
+        try:
+            node = json.loads(text)
+        except json.JSONDecodeError:
+            print("Error decoding LLM response")
+            return None
+        return node if isinstance(node, dict) else None
+
+def parse_nodes(content: str) -> list[dict]:
+    """
+    Nodes of a complete response, with the same rules as the streaming parser.
+    """
+    return NodeStreamParser().feed(content)
+
+def has_nodes(content: str, key: str = "nodes") -> bool:
+    """
+    True if content is a complete JSON object with a non-empty node list.
+    """
+    try:
+        data = json.loads(content)
+    except json.JSONDecodeError:
+        return False
+    return isinstance(data, dict) and isinstance(data.get(key), list) and len(data[key]) > 0
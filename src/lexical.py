@@ -0,0 +1,128 @@
+import json
+import math
+import os
+import re
+import numpy as np
+from .retrieval import SearchHit
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "how", "in", "into", "is",
+    "it", "of", "on", "or", "the", "to", "with", "your", "you", "learn", "learning", "introduction",
+}
+
+def tokenize(text: str) -> list[str]:
+    return [token for token in TOKEN_RE.findall(text.lower()) if token not in STOPWORDS]
+
+class BM25Index:
+    """
+    Okapi BM25 over corpus titles and descriptions, stored as compact CSR postings.
+
+    Layout of index_dir:
+      postings.npz  - doc_ids (int32), term_freqs (uint16), offsets (int64), doc_lengths (float32)
+      vocab.json    - list of terms; term i owns postings[offsets[i]:offsets[i + 1]]
+      payloads.json - list of payload dicts (with "id"), one per document
+    """
+    def __init__(self, doc_ids, term_freqs, offsets, doc_lengths, vocab: list[str], payloads: list[dict],
+                 k1: float = 1.2, b: float = 0.75):
+        self.doc_ids = doc_ids
+        self.term_freqs = term_freqs
+        self.offsets = offsets
+        self.doc_lengths = doc_lengths
+        self.vocab = {term: i for i, term in enumerate(vocab)}
+        self.payloads = payloads
+        self.k1 = k1
+        self.b = b
+        self.n_docs = len(doc_lengths)
+        self.avg_length = float(doc_lengths.mean()) if self.n_docs else 0.0
+
+    @classmethod
+    def build(cls, texts: list[str], payloads: list[dict]) -> "BM25Index":
+        postings = {}
+        doc_lengths = np.zeros(len(texts), dtype=np.float32)
+        for doc_id, text in enumerate(texts):
+            tokens = tokenize(text)
+            doc_lengths[doc_id] = len(tokens)
+            counts = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, count in counts.items():
+                postings.setdefault(token, []).append((doc_id, count))
+
+        vocab = sorted(postings)
+        offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+        for i, term in enumerate(vocab):
+            offsets[i + 1] = offsets[i] + len(postings[term])
+        doc_ids = np.empty(offsets[-1], dtype=np.int32)
+        term_freqs = np.empty(offsets[-1], dtype=np.uint16)
+        for i, term in enumerate(vocab):
+            entries = postings[term]
+            doc_ids[offsets[i]:offsets[i + 1]] = [doc_id for doc_id, _ in entries]
+            term_freqs[offsets[i]:offsets[i + 1]] = [min(count, 65535) for _, count in entries]
+        return cls(doc_ids, term_freqs, offsets, doc_lengths, vocab, payloads)
+
+    def save(self, index_dir: str):
+        os.makedirs(index_dir, exist_ok=True)
+        np.savez(
+            os.path.join(index_dir, "postings.npz"),
+            doc_ids=self.doc_ids, term_freqs=self.term_freqs,
+            offsets=self.offsets, doc_lengths=self.doc_lengths
+        )
+        with open(os.path.join(index_dir, "vocab.json"), "w", encoding="utf-8") as f:
+            json.dump(sorted(self.vocab, key=self.vocab.get), f)
+        with open(os.path.join(index_dir, "payloads.json"), "w", encoding="utf-8") as f:
+            json.dump(self.payloads, f)
+
+    @classmethod
+    def load(cls, index_dir: str) -> "BM25Index":
+        arrays = np.load(os.path.join(index_dir, "postings.npz"))
+        with open(os.path.join(index_dir, "vocab.json"), "r", encoding="utf-8") as f:
+            vocab = json.load(f)
+        with open(os.path.join(index_dir, "payloads.json"), "r", encoding="utf-8") as f:
+            payloads = json.load(f)
+        return cls(arrays["doc_ids"], arrays["term_freqs"], arrays["offsets"], arrays["doc_lengths"], vocab, payloads)
+
+    def search(self, query: str, limit: int, min_coverage: float = 0.5) -> list[SearchHit]:
+        """
+        Top-`limit` documents by BM25. A document must contain at least `min_coverage`
+        of the distinct query terms, so single common words don't produce matches.
+        """
+        query_terms = list(dict.fromkeys(tokenize(query)))
+        terms = [term for term in query_terms if term in self.vocab]
+        if not terms or not self.n_docs:
+            return []
+
+        scores = np.zeros(self.n_docs, dtype=np.float32)
+        matched = np.zeros(self.n_docs, dtype=np.int16)
+        length_norm = self.k1 * (1 - self.b + self.b * self.doc_lengths / max(self.avg_length, 1e-9))
+        for term in terms:
+            i = self.vocab[term]
+            docs = self.doc_ids[self.offsets[i]:self.offsets[i + 1]]
+            tf = self.term_freqs[self.offsets[i]:self.offsets[i + 1]].astype(np.float32)
+            idf = math.log(1 + (self.n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            # Postings hold each document at most once per term, so fancy-index += is safe
+            scores[docs] += idf * tf * (self.k1 + 1) / (tf + length_norm[docs])
+            matched[docs] += 1
+
+        scores[matched < math.ceil(min_coverage * len(query_terms))] = 0
+        candidates = np.flatnonzero(scores)
+        if not len(candidates):
+            return []
+        k = min(limit, len(candidates))
+        top = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        top = top[np.argsort(-scores[top])]
+        return [SearchHit(str(self.payloads[i].get("id", i)), float(scores[i]), self.payloads[i]) for i in top]
+
+def reciprocal_rank_fusion(ranked_lists: list[list[SearchHit]], limit: int, k: int = 60) -> list[SearchHit]:
+    """
+    Merges ranked hit lists with RRF: score(d) = sum over lists of 1 / (k + rank(d)).
+    The returned hits carry the fused score and the first payload seen for each id.
+    """
+    fused = {}
+    payloads = {}
+    for hits in ranked_lists:
+        for rank, hit in enumerate(hits):
+            fused[hit.id] = fused.get(hit.id, 0.0) + 1.0 / (k + rank + 1)
+            payloads.setdefault(hit.id, hit.payload)
+    ranked = sorted(fused.items(), key=lambda item: item[1], reverse=True)[:limit]
+    return [SearchHit(doc_id, score, payloads[doc_id]) for doc_id, score in ranked]
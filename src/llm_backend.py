@@ -0,0 +1,186 @@
+import asyncio
+import inspect
+import random
+import time
+from collections import deque
+from typing import Optional
+from .metrics import metrics
+from .dependencies import (
+    get_async_openai_client, LLM_MODEL, LLM_ATTEMPT_TIMEOUT, LLM_REQUEST_TIMEOUT, LLM_MAX_ATTEMPTS, LLM_BACKOFF,
+    LLM_HEDGE, LLM_HEDGE_QUANTILE
+)
+
+class LLMTimeoutError(TimeoutError):
+    pass
+
+class LatencyTracker:
+    """
+    Rolling window of recent attempt latencies; quantile() is None until min_samples are seen.
+    """
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.samples = deque(maxlen=window)
+        self.min_samples = min_samples
+
+    def observe(self, seconds: float):
+        self.samples.append(seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if len(self.samples) < self.min_samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+class LLMBackend:
+    """
+    Chat completions against any OpenAI-compatible server (LLM_BASE_URL), with a per-attempt
+    timeout, retries with jittered exponential backoff and optional hedging: when an attempt
+    has not answered within the observed p95 latency, a second one is sent and the first to
+    answer wins. For streamed requests an attempt ends at the first chunk (time to first
+    token, attempt_timeout); the SDK read timeout (OPENAI_TIMEOUT) still bounds stalls after
+    that. A non-streamed attempt is the whole completion, limited by request_timeout; those
+    are not hedged, since duplicating a whole completion costs as much as the original.
+    """
+    def __init__(self, client=None, model: str = LLM_MODEL, attempt_timeout: float = LLM_ATTEMPT_TIMEOUT,
+                 request_timeout: float = LLM_REQUEST_TIMEOUT, max_attempts: int = LLM_MAX_ATTEMPTS, backoff: float = LLM_BACKOFF,
+                 hedge: bool = LLM_HEDGE, hedge_quantile: float = LLM_HEDGE_QUANTILE):
+        self._client = client
+        self.model = model
+        self.attempt_timeout = attempt_timeout
+        self.request_timeout = request_timeout
+        self.max_attempts = max(1, max_attempts)
+        self.backoff = backoff
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.latencies = LatencyTracker()
+        self.attempts = metrics.counter("llm_attempts_total")
+        self.retries = metrics.counter("llm_retries_total")
+        self.attempt_timeouts = metrics.counter("llm_attempt_timeouts_total")
+        self.hedges = metrics.counter("llm_hedged_requests_total")
+        self.hedge_wins = metrics.counter("llm_hedge_wins_total")
+
+    @property
+    def client(self):
+        if self._client is None:
+            # Retries happen here, with per-attempt timeouts; the pooled client must not retry on its own
+            self._client = get_async_openai_client().with_options(max_retries=0)
+        return self._client
+
+    def hedge_delay(self, request: dict) -> Optional[float]:
+        if not self.hedge or not request.get("stream"):
+            return None
+        return self.latencies.quantile(self.hedge_quantile)
+
+    async def create(self, **request):
+        """
+        client.chat.completions.create(**request), defaulting to the backend's model.
+        """
+        request.setdefault("model", self.model)
+        for attempt in range(self.max_attempts):
+            if attempt:
+                self.retries.inc()
+                # Full jitter keeps clients that failed together from retrying together
+                await asyncio.sleep(random.uniform(0, self.backoff * 2 ** (attempt - 1)))
+            try:
+                return await self._hedged(request)
+            except Exception as e:
+                if attempt == self.max_attempts - 1 or not _retryable(e):
+                    raise
+                print(f"LLM attempt {attempt + 1}/{self.max_attempts} failed, retrying: {e!r}")
+
+    async def _hedged(self, request: dict):
+        delay = self.hedge_delay(request)
+        tasks = {asyncio.create_task(self._attempt(request))}
+        primary = next(iter(tasks))
+        try:
+            if delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done:
+                    self.hedges.inc()
+                    tasks.add(asyncio.create_task(self._attempt(request)))
+            error = None
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                winners = [task for task in done if task.exception() is None]
+                if winners:
+                    winner = primary if primary in winners else winners[0]
+                    for task in winners:
+                        if task is not winner:
+                            await _close(task.result())
+                    if winner is not primary:
+                        self.hedge_wins.inc()
+                    return winner.result()
+                error = next(iter(done)).exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _attempt(self, request: dict):
+        self.attempts.inc()
+        start = time.perf_counter()
+        timeout = self.attempt_timeout if request.get("stream") else self.request_timeout
+        try:
+            response = await asyncio.wait_for(self._open(request), timeout)
+        except asyncio.TimeoutError:
+            self.attempt_timeouts.inc()
+            raise LLMTimeoutError(f"No response from the LLM within {timeout:.1f}s")
+        if request.get("stream"):
+            # Time to first token, the latency hedging is based on
+            self.latencies.observe(time.perf_counter() - start)
+        return response
+
+    async def _open(self, request: dict):
+        if not request.get("stream"):
+            # The SDK read timeout (OPENAI_TIMEOUT) would otherwise cut long completions short
+            return await self.client.chat.completions.create(**{"timeout": self.request_timeout, **request})
+        response = await self.client.chat.completions.create(**request)
+        try:
+            first = await response.__anext__()
+        except StopAsyncIteration:
+            first = None
+        except BaseException:
+            # Timed out, cancelled (lost the hedge) or failed: release the connection
+            await _close(response)
+            raise
+        return PrefetchedStream(response, first)
+
+class PrefetchedStream:
+    """
+    A streamed response whose first chunk has already been read.
+    """
+    def __init__(self, response, first):
+        self.response = response
+        self.first = first
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.first is not None:
+            chunk, self.first = self.first, None
+            return chunk
+        return await self.response.__anext__()
+
+    async def close(self):
+        await _close(self.response)
+
+async def _close(response):
+    close = getattr(response, "close", None) or getattr(response, "aclose", None)
+    if close is None:
+        return
+    try:
+        result = close()
+        if inspect.isawaitable(result):
+            await result
+    except Exception as e:
+        print(f"Error closing LLM response: {e}")
+
+def _retryable(error: Exception) -> bool:
+    # Same policy as the OpenAI SDK: timeouts, connection errors, 408/409/429 and 5xx
+    if isinstance(error, (LLMTimeoutError, ConnectionError)):
+        return True
+    import openai
+    if isinstance(error, openai.APIConnectionError):
+        return True
+    status = getattr(error, "status_code", None)
+    return status is not None and (status in (408, 409, 429) or status >= 500)
@@ -0,0 +1,106 @@
+import hashlib
+import json
+from typing import Callable, Optional
+from .cache import TTLCache, SQLiteCache
+from .metrics import metrics
+
+LLM_CACHE_MODES = ("cache", "record", "replay", "off")
+
+class LLMCacheMiss(KeyError):
+    pass
+
+def request_key(model: str, messages: list[dict], response_format: Optional[dict] = None) -> str:
+    """
+    Content address of a chat completion request: sha256 of its canonical JSON.
+    """
+    payload = json.dumps(
+        {"model": model, "messages": messages, "response_format": response_format},
+        sort_keys=True, separators=(",", ":"), ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class LLMResponseCache:
+    """
+    Persistent cache of chat completion outputs, keyed on (model, messages, response_format).
+
+    Modes:
+      cache  - serve hits, call the LLM and store on a miss
+      record - always call the LLM and store the output without expiry (refreshes a fixture set)
+      replay - only serve stored outputs; a miss raises LLMCacheMiss (offline evaluation runs)
+      off    - always call the LLM, store nothing
+    """
+    def __init__(self, path: Optional[str], mode: str = "cache", ttl: Optional[float] = None,
+                 max_entries: int = 5000, memory_size: int = 256):
+        if mode not in LLM_CACHE_MODES:
+            raise ValueError(f"Unknown LLM cache mode '{mode}' (expected one of {', '.join(LLM_CACHE_MODES)})")
+        self.mode = mode
+        self.ttl = ttl
+        self.memory = TTLCache(max_size=memory_size, ttl=ttl)
+        self.disk = SQLiteCache(path, max_entries=max_entries, ttl=ttl) if path and mode != "off" else None
+
+    def get(self, key: str) -> Optional[str]:
+        content = self.memory.get(key)
+        if content is None and self.disk is not None:
+            content = self.disk.get(key)
+            if content is not None:
+                self.memory.set(key, content)
+        return content
+
+    def set(self, key: str, content: str):
+        # Recorded outputs are fixtures; they never expire
+        ttl = 0 if self.mode == "record" else None
+        self.memory.set(key, content, ttl=ttl)
+        if self.disk is not None:
+            self.disk.set(key, content, ttl=ttl)
+
+    async def complete(self, create, model: str, messages: list[dict], response_format: Optional[dict] = None,
+                       bypass: bool = False, validate: Optional[Callable[[str], bool]] = None) -> str:
+        """
+        Returns the message content for the request, from the cache or from `create`
+        (e.g. client.chat.completions.create). bypass skips the lookup but still records.
+        """
+        return "".join([delta async for delta in self.stream(create, model, messages, response_format, bypass, validate)])
+
+    async def stream(self, create, model: str, messages: list[dict], response_format: Optional[dict] = None,
+                     bypass: bool = False, validate: Optional[Callable[[str], bool]] = None):
+        """
+        Streaming variant of complete(): yields content deltas as the LLM produces them
+        (a cache hit is a single delta). The full output is stored once the stream finishes,
+        unless it was cut short (finish_reason other than "stop") or validate(content) is false.
+        """
+        key = request_key(model, messages, response_format)
+        if self.mode in ("cache", "replay") and not bypass:
+            content = self.get(key)
+            if content is not None:
+                metrics.counter("llm_cache_hits_total").inc()
+                yield content
+                return
+        if self.mode == "replay":
+            raise LLMCacheMiss(f"No recorded LLM response for request {key[:12]}")
+
+        kwargs = {"response_format": response_format} if response_format is not None else {}
+        response = await create(model=model, messages=messages, stream=True, **kwargs)
+        parts = []
+        finish_reason = None
+        async for chunk in response:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if chunk.choices:
+                finish_reason = getattr(chunk.choices[0], "finish_reason", None) or finish_reason
+            if delta:
+                parts.append(delta)
+                yield delta
+
+        # Only complete outputs are stored; an abandoned stream never gets here, and a truncated
+        # or malformed one would otherwise be replayed for the whole TTL
+        content = "".join(parts)
+        if not content or self.mode == "off":
+            return
+        if finish_reason not in (None, "stop"):
+            print(f"Not caching LLM response {key[:12]}: finish_reason={finish_reason}")
+        elif validate is not None and not validate(content):
+            print(f"Not caching LLM response {key[:12]}: failed validation")
+        else:
+            self.set(key, content)
+
+    def stats(self) -> dict:
+        return {"mode": self.mode, **self.memory.stats()}
@@ -1,10 +1,34 @@
-from fastapi import FastAPI, HTTPException
+import json
+import time
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from .dependencies import close_clients
+from .metrics import metrics
 from .models import RoadmapRequest, RoadmapResponse
-from .roadmap_engine import generate_roadmap
-import uvicorn
+from .roadmap_engine import RoadmapEngine
 
-app = FastAPI(title="OpenRoadMap API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Build agents and warm the embedding model before accepting traffic
+    start = time.perf_counter()
+    engine = RoadmapEngine()
+    timings = {"engine_init": time.perf_counter() - start}
+    timings.update(await engine.warmup())
+    timings["total"] = time.perf_counter() - start
+
+    print("Startup timings: " + ", ".join(f"{phase}={seconds:.2f}s" for phase, seconds in timings.items()))
+    app.state.engine = engine
+    app.state.startup_timings = timings
+
+    engine.eval_pipeline.start()
+    yield
+    # Flush pending evaluations before shutting down
+    await engine.eval_pipeline.stop()
+    await close_clients()
+
+app = FastAPI(title="OpenRoadMap API", lifespan=lifespan)
 
 # Configure CORS
 app.add_middleware(
@@ -15,17 +39,49 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+def get_engine(http_request: Request) -> RoadmapEngine:
+    return http_request.app.state.engine
+
 @app.post("/generate-roadmap", response_model=RoadmapResponse)
-async def create_roadmap(request: RoadmapRequest):
+async def create_roadmap(request: RoadmapRequest, engine: RoadmapEngine = Depends(get_engine)):
     try:
-        roadmap = generate_roadmap(request.goal)
+        roadmap = await engine.generate_roadmap(request.goal)
         return roadmap
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/generate-roadmap/stream")
+async def stream_roadmap(request: RoadmapRequest, engine: RoadmapEngine = Depends(get_engine)):
+    """
+    Streams the roadmap as NDJSON: a skeleton event, one event per curated node, then done.
+    """
+    async def event_lines():
+        try:
+            async for event in engine.generate_roadmap_stream(request.goal):
+                yield json.dumps(event) + "\n"
+        except Exception as e:
+            # Headers are already sent, so report failures in-band
+            yield json.dumps({"event": "error", "data": {"detail": str(e)}}) + "\n"
+
+    return StreamingResponse(event_lines(), media_type="application/x-ndjson")
+
 @app.get("/health")
 async def health_check():
     return {"status": "ok"}
 
+@app.get("/ready")
+async def readiness_check(http_request: Request):
+    # Lifespan only finishes (and the server only accepts requests) once the model is warm
+    return {"status": "ready", "startup_timings": http_request.app.state.startup_timings}
+
+@app.get("/cache/stats")
+async def get_cache_stats(engine: RoadmapEngine = Depends(get_engine)):
+    return engine.cache_stats()
+
+@app.get("/metrics")
+async def get_metrics():
+    return metrics.snapshot()
+
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run("src.main:app", host="0.0.0.0", port=8000, reload=True)
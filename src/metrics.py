@@ -0,0 +1,72 @@
+import threading
+from typing import Optional
+
+class Histogram:
+    """
+    Cumulative-bucket histogram (Prometheus style) with count and sum.
+    """
+    def __init__(self, buckets: list[float]):
+        self.buckets = sorted(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        with self._lock:
+            index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            cumulative = 0
+            buckets = {}
+            for bound, count in zip(self.buckets + ["+Inf"], self.counts):
+                cumulative += count
+                buckets[str(bound)] = cumulative
+            return {
+                "count": self.count,
+                "sum": self.sum,
+                "mean": self.sum / self.count if self.count else 0.0,
+                "buckets": buckets
+            }
+
+class Counter:
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self.value += amount
+
+    def snapshot(self) -> float:
+        return self.value
+
+class MetricsRegistry:
+    """
+    Process-wide registry of named metrics, served as JSON by GET /metrics.
+    """
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name: str, buckets: Optional[list[float]] = None) -> Histogram:
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = Histogram(buckets or [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10])
+            return self._metrics[name]
+
+    def counter(self, name: str) -> Counter:
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = Counter()
+            return self._metrics[name]
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {name: metric.snapshot() for name, metric in sorted(self._metrics.items())}
+
+metrics = MetricsRegistry()
@@ -0,0 +1,73 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from .cache import TTLCache
+from .metrics import metrics
+from .retrieval import SearchHit
+
+class CrossEncoderReranker:
+    """
+    Re-scores over-fetched candidates of every node of a roadmap in one batched cross-encoder pass.
+    If scoring doesn't finish within the per-request budget, the original (dense/fused) order is
+    kept; the late scores still land in the pair-score cache for next time.
+    """
+    def __init__(self, model_name: str, budget_ms: float = 300, cache_size: int = 20000):
+        self.model_name = model_name
+        self.budget = budget_ms / 1000
+        self._model = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="reranker")
+        self.pair_cache = TTLCache(max_size=cache_size)
+        self.latency = metrics.histogram("rerank_latency_seconds")
+        self.budget_exceeded = metrics.counter("rerank_budget_exceeded_total")
+
+    @property
+    def model(self):
+        if self._model is None:
+            from sentence_transformers import CrossEncoder
+            self._model = CrossEncoder(self.model_name)
+        return self._model
+
+    def _score(self, pairs: list[tuple[str, str]]) -> list[float]:
+        start = time.perf_counter()
+        scores = self.model.predict(pairs, batch_size=64, show_progress_bar=False)
+        self.latency.observe(time.perf_counter() - start)
+        return [float(score) for score in scores]
+
+    @staticmethod
+    def _document(hit: SearchHit) -> str:
+        return f"{hit.payload.get('title', '')}: {hit.payload.get('snippet', hit.payload.get('description', ''))}"
+
+    async def rerank_batch(self, queries: list[str], hits_per_query: list[list[SearchHit]], limit: int) -> list[list[SearchHit]]:
+        missing = list(dict.fromkeys(
+            (query, hit.id)
+            for query, hits in zip(queries, hits_per_query)
+            for hit in hits
+            if self.pair_cache.get((query, hit.id)) is None
+        ))
+        if missing:
+            documents = {hit.id: self._document(hit) for hits in hits_per_query for hit in hits}
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self._executor, self._score, [(query, documents[doc_id]) for query, doc_id in missing])
+
+            def store(done):
+                if not done.cancelled() and done.exception() is None:
+                    for pair, score in zip(missing, done.result()):
+                        self.pair_cache.set(pair, score)
+
+            future.add_done_callback(store)
+            try:
+                await asyncio.wait_for(asyncio.shield(future), self.budget)
+            except asyncio.TimeoutError:
+                self.budget_exceeded.inc()
+                print(f"Rerank budget of {self.budget * 1000:.0f} ms exceeded, keeping retrieval order")
+                return [hits[:limit] for hits in hits_per_query]
+            except Exception as e:
+                print(f"Rerank failed: {e}")
+                return [hits[:limit] for hits in hits_per_query]
+            # The done callback may not have run yet
+            store(future)
+
+        return [
+            sorted(hits, key=lambda hit: self.pair_cache.get((query, hit.id), float("-inf")), reverse=True)[:limit]
+            for query, hits in zip(queries, hits_per_query)
+        ]
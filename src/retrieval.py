@@ -0,0 +1,197 @@
+import asyncio
+import json
+import os
+from typing import NamedTuple, Optional
+import numpy as np
+from .dependencies import get_async_qdrant_client, COLLECTION_NAME
+
+HNSW_FILE = "hnsw.bin"
+
+class SearchHit(NamedTuple):
+    id: str
+    score: float
+    payload: dict
+
+class QdrantBackend:
+    """
+    Dense search against the Qdrant server (one batch request per call).
+    search_params come from the collection profile (HNSW ef, quantization rescoring);
+    payload_fields limits the payload returned per hit (None returns all of it). Collections
+    indexed before payloads had a "snippet" get "description" requested instead.
+    """
+    def __init__(self, client, collection_name: str, search_params=None, payload_fields: Optional[list[str]] = None):
+        self.client = client
+        self.collection_name = collection_name
+        self.search_params = search_params
+        self.payload_fields = payload_fields
+
+    async def search_batch(self, query_vectors: np.ndarray, limit: int, score_threshold: float) -> list[list[SearchHit]]:
+        from qdrant_client import models
+
+        responses = await self.client.query_batch_points(
+            collection_name=self.collection_name,
+            requests=[
+                models.QueryRequest(
+                    query=vector.tolist(),
+                    limit=limit,
+                    with_payload=self.payload_fields or True,
+                    params=self.search_params,
+                    score_threshold=score_threshold
+                )
+                for vector in query_vectors
+            ]
+        )
+        results = [
+            [SearchHit(str(point.id), point.score, point.payload or {}) for point in response.points]
+            for response in responses
+        ]
+        await self._fill_missing_snippets(results)
+        return results
+
+    async def _fill_missing_snippets(self, results: list[list[SearchHit]]):
+        if not self.payload_fields or "snippet" not in self.payload_fields or "description" in self.payload_fields:
+            return
+        missing = {hit.id: hit for hits in results for hit in hits if "snippet" not in hit.payload}
+        if not missing:
+            return
+        # Indexed before snippets existed (re-run vectorize_corpus.py): fetch descriptions from now on
+        print("Collection payloads have no 'snippet'; requesting 'description' instead (reindex to fix).")
+        self.payload_fields = self.payload_fields + ["description"]
+        points = await self.client.retrieve(
+            collection_name=self.collection_name,
+            ids=[int(point_id) if point_id.isdigit() else point_id for point_id in missing],
+            with_payload=["description"]
+        )
+        for point in points:
+            hit = missing.get(str(point.id))
+            if hit is not None and point.payload:
+                hit.payload["description"] = point.payload.get("description", "")
+
+class EmbeddedIndexBackend:
+    """
+    In-process exact (or optional HNSW) cosine search over a memory-mapped embedding matrix.
+    Intended for corpora up to a few hundred thousand items, where the HTTP hop to
+    Qdrant costs more than the search. Built by `vectorize_corpus.py --local-index-dir`.
+
+    Layout of index_dir:
+      vectors.npy   - (n, dim) float32 or float16, rows L2-normalized
+      payloads.json - list of n payload dicts, each with an "id"
+      hnsw.bin      - optional hnswlib graph over the vectors, loaded when use_hnsw is set
+    """
+    # Rows scored per matmul so a float16 matrix is never upcast all at once
+    CHUNK_ROWS = 65536
+
+    def __init__(self, index_dir: str, use_hnsw: bool = False):
+        self.index_dir = index_dir
+        self.matrix = np.load(os.path.join(index_dir, "vectors.npy"), mmap_mode="r")
+        with open(os.path.join(index_dir, "payloads.json"), "r", encoding="utf-8") as f:
+            self.payloads = json.load(f)
+        if len(self.payloads) != self.matrix.shape[0]:
+            raise ValueError(f"Index at {index_dir} is inconsistent: {self.matrix.shape[0]} vectors, {len(self.payloads)} payloads")
+        self.hnsw = self._load_hnsw() if use_hnsw else None
+
+    def _load_hnsw(self):
+        # The graph is built offline; building it here would cost every worker a float32 copy and minutes of startup
+        path = os.path.join(self.index_dir, HNSW_FILE)
+        if not os.path.exists(path):
+            print(f"No HNSW graph at {path} (re-run vectorize_corpus.py --local-index-dir), using exact search.")
+            return None
+        try:
+            import hnswlib
+        except ImportError:
+            print("hnswlib not installed, using exact search.")
+            return None
+        n, dim = self.matrix.shape
+        index = hnswlib.Index(space="ip", dim=dim)
+        index.load_index(path, max_elements=max(n, 1))
+        if index.get_current_count() != n:
+            print(f"HNSW graph at {path} doesn't match the index ({index.get_current_count()} of {n} vectors), using exact search.")
+            return None
+        index.set_ef(64)
+        return index
+
+    async def search_batch(self, query_vectors: np.ndarray, limit: int, score_threshold: float) -> list[list[SearchHit]]:
+        # Keep the (CPU bound) search off the event loop
+        return await asyncio.to_thread(self.search_batch_sync, query_vectors, limit, score_threshold)
+
+    def search_batch_sync(self, query_vectors: np.ndarray, limit: int, score_threshold: float) -> list[list[SearchHit]]:
+        n = self.matrix.shape[0]
+        if n == 0 or len(query_vectors) == 0:
+            return [[] for _ in query_vectors]
+
+        queries = np.asarray(query_vectors, dtype=np.float32)
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        queries = queries / np.where(norms == 0, 1, norms)
+        k = min(limit, n)
+
+        if self.hnsw is not None:
+            labels, distances = self.hnsw.knn_query(queries, k=k)
+            # "ip" space returns 1 - inner product
+            top_indexes, top_scores = labels, 1.0 - distances
+        else:
+            scores = np.empty((len(queries), n), dtype=np.float32)
+            for start in range(0, n, self.CHUNK_ROWS):
+                chunk = np.asarray(self.matrix[start:start + self.CHUNK_ROWS], dtype=np.float32)
+                scores[:, start:start + len(chunk)] = queries @ chunk.T
+            top_indexes = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            top_scores = np.take_along_axis(scores, top_indexes, axis=1)
+            order = np.argsort(-top_scores, axis=1)
+            top_indexes = np.take_along_axis(top_indexes, order, axis=1)
+            top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+        results = []
+        for indexes, row_scores in zip(top_indexes, top_scores):
+            hits = []
+            for index, score in zip(indexes, row_scores):
+                # Same semantics as Qdrant's score_threshold
+                if score < score_threshold:
+                    break
+                payload = self.payloads[int(index)]
+                hits.append(SearchHit(str(payload.get("id", index)), float(score), payload))
+            results.append(hits)
+        return results
+
+def write_embedded_index(index_dir: str, vectors: np.ndarray, payloads: list[dict], dtype: str = "float32",
+                         hnsw: bool = False):
+    """
+    Writes an index readable by EmbeddedIndexBackend. Vectors are L2-normalized before saving.
+    With hnsw, also builds and saves the HNSW graph (needs hnswlib; skipped without it).
+    """
+    os.makedirs(index_dir, exist_ok=True)
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = vectors / np.where(norms == 0, 1, norms)
+    np.save(os.path.join(index_dir, "vectors.npy"), vectors.astype(dtype))
+    with open(os.path.join(index_dir, "payloads.json"), "w", encoding="utf-8") as f:
+        json.dump(payloads, f)
+
+    path = os.path.join(index_dir, HNSW_FILE)
+    # A graph left from a previous build would point at the wrong vectors
+    if os.path.exists(path):
+        os.remove(path)
+    if not hnsw:
+        return
+    try:
+        import hnswlib
+    except ImportError:
+        print("hnswlib not installed, skipping the HNSW graph (LOCAL_INDEX_HNSW will use exact search).")
+        return
+    n, dim = vectors.shape
+    index = hnswlib.Index(space="ip", dim=dim)
+    index.init_index(max_elements=max(n, 1), ef_construction=200, M=16)
+    if n:
+        index.add_items(vectors, np.arange(n))
+    index.save_index(path)
+
+def get_retrieval_backend(backend: str, index_dir: Optional[str] = None, use_hnsw: bool = False, profile: str = "default"):
+    if backend == "qdrant":
+        from .collection_profiles import get_profile, build_search_params, QUERY_PAYLOAD_FIELDS
+        return QdrantBackend(
+            get_async_qdrant_client(),
+            COLLECTION_NAME,
+            search_params=build_search_params(get_profile(profile)),
+            payload_fields=QUERY_PAYLOAD_FIELDS
+        )
+    if backend == "embedded":
+        return EmbeddedIndexBackend(index_dir, use_hnsw=use_hnsw)
+    raise ValueError(f"Unknown retrieval backend '{backend}' (expected 'qdrant' or 'embedded')")
@@ -1,41 +1,317 @@
+import asyncio
+import time
 from .models import RoadmapNode, RoadmapResponse
-from .agents.roadmap_agent import RoadmapAgent
+from .agents.roadmap_agent import RoadmapAgent, PROMPT_VERSION, roadmap_order
 from .agents.resource_agent import ResourceAgent
 from .agents.eval_agent import EvaluationAgent
+from .cache import RoadmapCache
+from .eval_pipeline import EvaluationPipeline
+from .semantic_cache import SemanticGoalCache
+from .singleflight import SingleFlight
+from .dependencies import (
+    CURATION_CONCURRENCY, CURATION_BATCH_WINDOW_MS, CORPUS_VERSION, HIERARCHICAL_GENERATION,
+    ROADMAP_CACHE_SIZE, ROADMAP_CACHE_TTL, ROADMAP_CACHE_PATH,
+    SEMANTIC_CACHE_THRESHOLD, SEMANTIC_CACHE_SIZE, EVAL_RESULTS_PATH
+)
 
-# Initialize agents
-roadmap_agent = RoadmapAgent()
-resource_agent = ResourceAgent()
-eval_agent = EvaluationAgent()
-
-def generate_roadmap(goal: str) -> RoadmapResponse:
-    print(f"Orchestrator: Starting roadmap generation for '{goal}'...")
-    
-    # 1. Plan: Generate Structure
-    print("Agent: RoadmapAgent working...")
-    nodes_data = roadmap_agent.generate_structure(goal)
-    
-    roadmap_nodes = []
-    
-    # 2. Curate: Find Resources for each node
-    print("Agent: ResourceAgent working...")
-    for node_data in nodes_data:
-        query = f"{node_data['title']}: {node_data['description']}"
-        resources = resource_agent.find_resources(query, limit=3)
-        
-        roadmap_nodes.append(RoadmapNode(
-            id=node_data["id"],
-            title=node_data["title"],
-            description=node_data["description"],
-            prerequisites=node_data.get("prerequisites", []),
-            resources=resources
-        ))
-        
-    roadmap = RoadmapResponse(goal=goal, nodes=roadmap_nodes)
-    
-    # 3. Evaluate: Check Quality
-    print("Agent: EvaluationAgent working...")
-    eval_result = eval_agent.evaluate(roadmap)
-    print(f"Evaluation Result: {eval_result}")
-    
-    return roadmap
+# Representative node queries used to warm the embedding model before serving
+WARMUP_QUERIES = [
+    "Fundamentals: JSX, Components, Props & State",
+    "Version Control: Git basics",
+]
+
+def _node_query(node_data: dict) -> str:
+    return f"{node_data['title']}: {node_data['description']}"
+
+def _build_node(node_data: dict, resources: list) -> RoadmapNode:
+    return RoadmapNode(
+        id=node_data["id"],
+        title=node_data["title"],
+        description=node_data["description"],
+        prerequisites=node_data.get("prerequisites", []),
+        resources=resources
+    )
+
+class _Progress:
+    """
+    Events of one in-flight generation ("skeleton" with the planned nodes, then "node" per
+    curated node), so streaming callers can follow a generation another request started.
+    """
+    def __init__(self):
+        self.events = []
+        self.changed = asyncio.Event()
+
+    def publish(self, kind: str, value):
+        self.events.append((kind, value))
+        self.changed.set()
+
+    async def follow(self, generation: asyncio.Future):
+        """
+        Yields every event (from the first one) until the generation finishes.
+        """
+        index = 0
+        while True:
+            while index < len(self.events):
+                yield self.events[index]
+                index += 1
+            if generation.done():
+                return
+            self.changed.clear()
+            changed = asyncio.ensure_future(self.changed.wait())
+            try:
+                await asyncio.wait({generation, changed}, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                changed.cancel()
+
+class RoadmapEngine:
+    """
+    Orchestrates the agents: plan (RoadmapAgent), curate (ResourceAgent), evaluate (EvaluationAgent).
+    Built once per process by the FastAPI lifespan handler rather than at import time.
+    """
+    def __init__(self, hierarchical: bool = HIERARCHICAL_GENERATION,
+                 roadmap_agent: RoadmapAgent = None, resource_agent: ResourceAgent = None):
+        self.hierarchical = hierarchical
+        # Initialize agents (tests pass their own)
+        self.roadmap_agent = roadmap_agent or RoadmapAgent()
+        self.resource_agent = resource_agent or ResourceAgent()
+        self.eval_agent = EvaluationAgent()
+        self.eval_pipeline = EvaluationPipeline(self.eval_agent, sink_path=EVAL_RESULTS_PATH)
+
+        # Other prompt profiles and staged roadmaps come from different prompts
+        prompt_version = PROMPT_VERSION
+        if self.roadmap_agent.prompt_profile != "few_shot":
+            prompt_version += f"/{self.roadmap_agent.prompt_profile}"
+        if hierarchical:
+            prompt_version += "+stages"
+        self.roadmap_cache = RoadmapCache(
+            model=self.roadmap_agent.backend.model,
+            prompt_version=prompt_version,
+            corpus_version=CORPUS_VERSION,
+            max_size=ROADMAP_CACHE_SIZE,
+            ttl=ROADMAP_CACHE_TTL,
+            path=ROADMAP_CACHE_PATH
+        )
+        self.semantic_cache = SemanticGoalCache(
+            encode=self.resource_agent.encode,
+            threshold=SEMANTIC_CACHE_THRESHOLD,
+            max_entries=SEMANTIC_CACHE_SIZE,
+            ttl=ROADMAP_CACHE_TTL
+        )
+        # Concurrent requests for the same goal share one generation, streamed or not
+        self.inflight = SingleFlight()
+        self._progress = {}  # cache key -> _Progress of the generation in flight
+
+    async def warmup(self) -> dict:
+        """
+        Loads and warms the embedding model so the first request doesn't pay for it.
+        Returns the time spent in each phase, in seconds.
+        """
+        timings = {}
+
+        start = time.perf_counter()
+        import sentence_transformers  # noqa: F401 (pulls in torch)
+        timings["import"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        self.resource_agent.model
+        timings["model_load"] = time.perf_counter() - start
+
+        if self.resource_agent.reranker is not None:
+            start = time.perf_counter()
+            self.resource_agent.reranker.model
+            timings["rerank_model_load"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        await self.resource_agent.encode(WARMUP_QUERIES)
+        timings["warmup"] = time.perf_counter() - start
+
+        return timings
+
+    async def _get_cached(self, goal: str):
+        roadmap = self.roadmap_cache.get(goal)
+        if roadmap is None:
+            match = await self.semantic_cache.match(goal)
+            if match is not None:
+                roadmap, expires_at = match
+                # Next time the same wording is an exact hit, until the matched entry expires
+                remaining = max(expires_at - time.time(), 1e-3) if expires_at else None
+                self.roadmap_cache.set(goal, roadmap, ttl=remaining)
+        return roadmap
+
+    async def _set_cached(self, goal: str, roadmap: RoadmapResponse):
+        # Don't pin failed generations in the cache
+        if roadmap.nodes:
+            self.roadmap_cache.set(goal, roadmap)
+            try:
+                await self.semantic_cache.set(goal, roadmap)
+            except Exception as e:
+                # The roadmap is built and the exact cache has it; only near-duplicate reuse is lost
+                print(f"Orchestrator: Semantic cache write failed for '{goal}': {e}")
+
+    async def generate_roadmap(self, goal: str, max_concurrency: int = CURATION_CONCURRENCY) -> RoadmapResponse:
+        cached = await self._get_cached(goal)
+        if cached is not None:
+            print(f"Orchestrator: Cache hit for '{goal}'")
+            return cached
+
+        roadmap = await self.inflight.do(
+            self.roadmap_cache.make_key(goal),
+            lambda: self._generate_roadmap(goal, max_concurrency)
+        )
+        # Waiters may have phrased the goal differently from the first caller
+        return roadmap.model_copy(update={"goal": goal})
+
+    async def _plan_and_curate(self, goal: str, max_concurrency: int):
+        """
+        Streams the plan from the LLM and starts retrieval for nodes as soon as they are parsed,
+        so curation overlaps generation. Nodes parsed together (same delta, or within
+        CURATION_BATCH_WINDOW_MS) share one batched search and rerank pass.
+        Yields ("planned", nodes_data) once the plan is complete,
+        then ("curated", index, resources) for each node as its resources resolve.
+        """
+        # One web-fallback limit for the whole roadmap, although nodes are curated in several batches
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        curated = asyncio.Queue()
+        batch = None  # (index, node_data) pairs waiting for the next batch
+
+        async def curate(items: list):
+            nonlocal batch
+            await asyncio.sleep(CURATION_BATCH_WINDOW_MS / 1000)
+            if batch is items:
+                batch = None
+            try:
+                queries = [_node_query(node_data) for _, node_data in items]
+                async for position, resources in self.resource_agent.iter_resources_batch(queries, limit=3, semaphore=semaphore):
+                    curated.put_nowait((items[position][0], resources, None))
+            except Exception as e:
+                curated.put_nowait((None, None, e))
+
+        nodes_data = []
+        tasks = []
+        try:
+            if self.hierarchical:
+                plan = self.roadmap_agent.stream_hierarchical_structure(goal)
+            else:
+                plan = self.roadmap_agent.stream_structure(goal)
+            async for node_data in plan:
+                if batch is None:
+                    batch = []
+                    tasks.append(asyncio.ensure_future(curate(batch)))
+                batch.append((len(nodes_data), node_data))
+                nodes_data.append(node_data)
+            # Prerequisites are final only now (staged plans link their stages at the end).
+            # Staged nodes arrive interleaved across stages; put them in a stable roadmap order
+            order = roadmap_order(nodes_data)
+            position = {arrival: index for index, arrival in enumerate(order)}
+            nodes_data = [nodes_data[arrival] for arrival in order]
+            for node_data in nodes_data:
+                node_data.pop("_position", None)
+            yield "planned", nodes_data
+
+            for _ in range(len(nodes_data)):
+                arrival, resources, error = await curated.get()
+                if error is not None:
+                    raise error
+                yield "curated", position[arrival], resources
+        finally:
+            # Don't leave retrieval running if generation fails or the consumer stops early
+            for task in tasks:
+                task.cancel()
+
+    def _progress_for(self, key: str) -> _Progress:
+        progress = self._progress.get(key)
+        if progress is None:
+            progress = self._progress[key] = _Progress()
+        return progress
+
+    async def _generate_roadmap(self, goal: str, max_concurrency: int) -> RoadmapResponse:
+        print(f"Orchestrator: Starting roadmap generation for '{goal}'...")
+        key = self.roadmap_cache.make_key(goal)
+        progress = self._progress_for(key)
+        try:
+            # 1. Plan and 2. Curate: RoadmapAgent streams nodes, ResourceAgent curates each one as it arrives
+            print("Agent: RoadmapAgent and ResourceAgent working...")
+            nodes_data = []
+            roadmap_nodes = []
+            async for event in self._plan_and_curate(goal, max_concurrency):
+                if event[0] == "planned":
+                    nodes_data = event[1]
+                    roadmap_nodes = [_build_node(node_data, []) for node_data in nodes_data]
+                    progress.publish("skeleton", list(roadmap_nodes))
+                else:
+                    _, index, resources = event
+                    roadmap_nodes[index] = _build_node(nodes_data[index], resources)
+                    progress.publish("node", roadmap_nodes[index])
+        finally:
+            if self._progress.get(key) is progress:
+                del self._progress[key]
+
+        roadmap = RoadmapResponse(goal=goal, nodes=roadmap_nodes)
+
+        # 3. Evaluate: Check Quality (in the background, after the response is sent)
+        self.eval_pipeline.submit(roadmap)
+
+        await self._set_cached(goal, roadmap)
+        return roadmap
+
+    async def generate_roadmap_stream(self, goal: str, max_concurrency: int = CURATION_CONCURRENCY):
+        """
+        Streaming variant of generate_roadmap.
+        Yields a "skeleton" event with the DAG (no resources) as soon as the LLM finishes,
+        then one "node" event per node as its resources resolve, then a final "done" event.
+        Retrieval for each node starts while the LLM is still generating the rest.
+        Concurrent calls for the same goal, streamed or not, share one generation.
+        """
+        cached = await self._get_cached(goal)
+        if cached is not None:
+            print(f"Orchestrator: Cache hit for '{goal}'")
+            for event in self._replay(goal, cached, sent=set(), skeleton=True):
+                yield event
+            yield {"event": "done", "data": {"goal": goal, "node_count": len(cached.nodes), "cached": True}}
+            return
+
+        # Start the generation, or join the one another request (streamed or not) already started
+        print(f"Orchestrator: Streaming roadmap generation for '{goal}'...")
+        key = self.roadmap_cache.make_key(goal)
+        progress = self._progress_for(key)
+        generation = asyncio.ensure_future(
+            self.inflight.do(key, lambda: self._generate_roadmap(goal, max_concurrency))
+        )
+        try:
+            sent = set()
+            skeleton = False
+            async for kind, value in progress.follow(generation):
+                if kind == "skeleton":
+                    # 1. Plan: the full DAG, without resources
+                    skeleton = True
+                    yield {"event": "skeleton", "data": RoadmapResponse(goal=goal, nodes=value).model_dump()}
+                else:
+                    # 2. Curate: emit each node as soon as its resources are ready
+                    sent.add(value.id)
+                    yield {"event": "node", "data": value.model_dump()}
+            roadmap = await generation
+            # Joined too late to see some events (e.g. the generation finished in between): replay them
+            for event in self._replay(goal, roadmap, sent, skeleton=not skeleton):
+                yield event
+        finally:
+            # Our share of the work: cancelled only when no other caller is waiting for it
+            generation.cancel()
+
+        yield {"event": "done", "data": {"goal": goal, "node_count": len(roadmap.nodes), "cached": False}}
+
+    @staticmethod
+    def _replay(goal: str, roadmap: RoadmapResponse, sent: set, skeleton: bool):
+        if skeleton:
+            nodes = [node.model_copy(update={"resources": []}) for node in roadmap.nodes]
+            yield {"event": "skeleton", "data": RoadmapResponse(goal=goal, nodes=nodes).model_dump()}
+        for node in roadmap.nodes:
+            if node.id not in sent:
+                yield {"event": "node", "data": node.model_dump()}
+
+    def cache_stats(self) -> dict:
+        return {
+            "exact": self.roadmap_cache.stats(),
+            "semantic": self.semantic_cache.stats(),
+            "nodes": self.resource_agent.resource_cache.stats(),
+            "query_embeddings": self.resource_agent.embedding_cache.stats()
+        }
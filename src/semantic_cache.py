@@ -0,0 +1,99 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional
+import numpy as np
+from .cache import TTLCache, normalize_goal
+from .models import RoadmapResponse
+
+class SemanticGoalCache:
+    """
+    Reuses roadmaps across near-duplicate goals ("learn react", "React development").
+    Goals are embedded with the same sentence-transformer as retrieval and matched
+    by cosine similarity against an in-memory index of previously generated goals.
+    Entries expire ttl seconds after they are set, like the exact roadmap cache.
+    """
+    def __init__(self, encode: Callable[[list[str]], Awaitable[np.ndarray]],
+                 threshold: float = 0.85, max_entries: int = 1024, ttl: Optional[float] = None):
+        self.encode = encode
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # normalized goal -> (unit vector, roadmap, expires_at)
+        self._matrix = None
+        self._keys = []
+        self._lock = threading.Lock()
+        # Avoid re-encoding a goal between a miss and the following set
+        self._embeddings = TTLCache(max_size=256)
+        self.hits = 0
+        self.misses = 0
+
+    async def _embed(self, goal: str) -> np.ndarray:
+        key = normalize_goal(goal)
+        vector = self._embeddings.get(key)
+        if vector is None:
+            vector = np.asarray((await self.encode([key]))[0], dtype=np.float32)
+            norm = np.linalg.norm(vector)
+            if norm > 0:
+                vector = vector / norm
+            self._embeddings.set(key, vector)
+        return vector
+
+    def _index(self):
+        # Rebuilt lazily after writes or expiries; reads are a single matrix-vector product
+        now = time.time()
+        expired = [key for key, (_, _, expires_at) in self._entries.items()
+                   if expires_at is not None and expires_at < now]
+        for key in expired:
+            del self._entries[key]
+        if expired:
+            self._matrix = None
+        if self._matrix is None and self._entries:
+            self._keys = list(self._entries.keys())
+            self._matrix = np.vstack([vector for vector, _, _ in self._entries.values()])
+        return self._matrix
+
+    async def get(self, goal: str) -> Optional[RoadmapResponse]:
+        match = await self.match(goal)
+        return None if match is None else match[0]
+
+    async def match(self, goal: str) -> Optional[tuple[RoadmapResponse, Optional[float]]]:
+        """
+        The closest cached roadmap and the time it expires at (None if it doesn't), or None.
+        """
+        vector = await self._embed(goal)
+        with self._lock:
+            matrix = self._index()
+            if matrix is None:
+                self.misses += 1
+                return None
+            scores = matrix @ vector
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                self.misses += 1
+                return None
+            key = self._keys[best]
+            self._entries.move_to_end(key)
+            _, roadmap, expires_at = self._entries[key]
+            self.hits += 1
+        print(f"Semantic cache hit: '{goal}' ~ '{key}' ({scores[best]:.3f})")
+        return roadmap.model_copy(update={"goal": goal}), expires_at
+
+    async def set(self, goal: str, roadmap: RoadmapResponse):
+        vector = await self._embed(goal)
+        expires_at = time.time() + self.ttl if self.ttl else None
+        with self._lock:
+            self._entries[normalize_goal(goal)] = (vector, roadmap, expires_at)
+            self._entries.move_to_end(normalize_goal(goal))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._matrix = None
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0
+        }
@@ -0,0 +1,46 @@
+import asyncio
+from typing import Awaitable, Callable, Hashable
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into one execution.
+    The first caller starts the work; callers arriving while it is in flight await
+    the same result (or exception). The work is cancelled only once every waiter has gone.
+    """
+    def __init__(self):
+        self._inflight = {}  # key -> (task, waiter count)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable]):
+        entry = self._inflight.get(key)
+        if entry is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = [task, 0]
+            # Forget the key as soon as the work settles so later calls start fresh
+            task.add_done_callback(lambda _: self._forget(key, task))
+            entry = self._inflight[key]
+
+        task = entry[0]
+        entry[1] += 1
+        try:
+            # shield() so one waiter's cancellation doesn't cancel the shared work
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.done() and entry[1] == 1:
+                task.cancel()
+            raise
+        finally:
+            entry[1] -= 1
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        entry = self._inflight.get(key)
+        if entry is not None and entry[0] is task:
+            del self._inflight[key]
+        # Retrieve the exception so an unawaited failure isn't logged as "never retrieved"
+        if not task.cancelled():
+            task.exception()
+
+    def __contains__(self, key: Hashable):
+        return key in self._inflight
+
+    def __len__(self):
+        return len(self._inflight)
@@ -1,5 +1,6 @@
 import sys
 import os
+import asyncio
 sys.path.append(os.getcwd())
 
 try:
@@ -7,7 +8,7 @@ try:
     print("Import successful")
     agent = ResourceAgent()
     print("Agent initialized")
-    results = agent.find_resources("React", limit=1)
+    results = asyncio.run(agent.find_resources("React", limit=1))
     print(f"Found {len(results)} results")
     for res in results:
         print(f" - {res.title} (ID: {res.id})")
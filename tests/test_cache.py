@@ -0,0 +1,132 @@
+import sys
+import os
+import time
+import tempfile
+sys.path.append(os.getcwd())
+
+from src.cache import TTLCache, SQLiteCache, RoadmapCache, ResourceCache, normalize_goal, write_corpus_version
+from src.models import RoadmapResponse, RoadmapNode, Resource
+
+def make_roadmap(goal):
+    return RoadmapResponse(goal=goal, nodes=[RoadmapNode(id="basics", title="Basics", description="Syntax")])
+
+def test_normalize_goal():
+    assert normalize_goal("  Learn   Python! ") == "learn python"
+    assert normalize_goal("React Development") == normalize_goal("react development.")
+
+def test_ttl_cache_lru_eviction():
+    cache = TTLCache(max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+def test_ttl_cache_expiry():
+    cache = TTLCache(max_size=10, ttl=0.05)
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    time.sleep(0.1)
+    assert cache.get("a") is None
+    assert cache.stats()["hits"] == 1
+
+def test_sqlite_cache_persists_and_evicts():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "cache.sqlite")
+        cache = SQLiteCache(path, max_entries=2)
+        cache.set("a", {"x": 1})
+        cache.set("b", {"x": 2})
+        cache.set("c", {"x": 3})
+        assert len(cache) == 2
+        assert cache.get("a") is None
+        cache.close()
+
+        reopened = SQLiteCache(path, max_entries=2)
+        assert reopened.get("c") == {"x": 3}
+        reopened.close()
+
+def test_sqlite_cache_reads_keep_lru_order_without_writes():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "cache.sqlite")
+        cache = SQLiteCache(path, max_entries=2)
+        cache.set("a", {"x": 1})
+        cache.set("b", {"x": 2})
+        changes = cache._conn.total_changes
+        time.sleep(0.01)
+        assert cache.get("a") == {"x": 1}
+        assert cache._conn.total_changes == changes  # the hit wrote nothing
+        cache.set("c", {"x": 3})
+        # "a" was read after "b" was written, so "b" is the one evicted
+        assert cache.get("a") == {"x": 1} and cache.get("b") is None
+        cache.close()
+
+def test_roadmap_cache_key_and_disk_tier():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "roadmaps.sqlite")
+        cache = RoadmapCache("gpt-4o", "1", "1", path=path)
+        cache.set("Learn Python", make_roadmap("Learn Python"))
+
+        hit = cache.get("learn python")
+        assert hit is not None and hit.goal == "learn python"
+        assert hit.nodes[0].id == "basics"
+
+        # A fresh process only has the disk tier
+        restarted = RoadmapCache("gpt-4o", "1", "1", path=path)
+        assert restarted.get("Learn Python") is not None
+
+        # Different prompt version must miss
+        bumped = RoadmapCache("gpt-4o", "2", "1", path=path)
+        assert bumped.get("Learn Python") is None
+
+def test_roadmap_cache_promotes_with_remaining_ttl():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "roadmaps.sqlite")
+        RoadmapCache("gpt-4o", "1", "1", ttl=0.2, path=path).set("Learn Python", make_roadmap("Learn Python"))
+        time.sleep(0.1)
+        restarted = RoadmapCache("gpt-4o", "1", "1", ttl=0.2, path=path)
+        assert restarted.get("Learn Python") is not None
+        # The memory copy expires with the disk row, not a full TTL after the promotion
+        time.sleep(0.15)
+        assert restarted.get("Learn Python") is None
+
+def test_resource_cache_invalidated_by_reindex():
+    resources = [Resource(title="Git Book", url="https://git-scm.com/book", description="Pro Git", type="book")]
+    with tempfile.TemporaryDirectory() as tmp:
+        marker = os.path.join(tmp, "corpus_version")
+        path = os.path.join(tmp, "nodes.sqlite")
+        write_corpus_version(marker)
+        cache = ResourceCache("1", version_path=marker, path=path)
+        cache.set("Git: Version control basics", 3, resources)
+
+        assert cache.get("git: version control basics", 3) == resources
+        assert cache.get("Git: Version control basics", 5) is None
+        # A fresh process only has the disk tier
+        assert ResourceCache("1", version_path=marker, path=path).get("Git: Version control basics", 3) == resources
+
+        # vectorize_corpus.py rewrites the marker; existing entries must miss without a restart
+        time.sleep(0.01)
+        write_corpus_version(marker)
+        assert cache.get("Git: Version control basics", 3) is None
+
+def test_resource_cache_web_ttl():
+    resources = [Resource(title="Glazing 101", url="https://example.com/glaze", description="Glazes", type="Web Resource")]
+    cache = ResourceCache("1", local_ttl=60, web_ttl=0.05)
+    cache.set("Pottery: Glazing", 3, resources, from_web=True)
+    cache.set("Python: Basics", 3, resources)
+    time.sleep(0.1)
+    assert cache.get("Pottery: Glazing", 3) is None
+    assert cache.get("Python: Basics", 3) == resources
+
+if __name__ == "__main__":
+    test_normalize_goal()
+    test_ttl_cache_lru_eviction()
+    test_ttl_cache_expiry()
+    test_sqlite_cache_persists_and_evicts()
+    test_sqlite_cache_reads_keep_lru_order_without_writes()
+    test_roadmap_cache_key_and_disk_tier()
+    test_roadmap_cache_promotes_with_remaining_ttl()
+    test_resource_cache_invalidated_by_reindex()
+    test_resource_cache_web_ttl()
+    print("All tests passed.")
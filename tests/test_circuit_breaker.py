@@ -0,0 +1,40 @@
+import sys
+import os
+import time
+sys.path.append(os.getcwd())
+
+from src.circuit_breaker import CircuitBreaker
+
+def test_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+def test_half_open_allows_one_trial():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    assert not breaker.allow()
+    time.sleep(0.06)
+
+    assert breaker.allow()
+    assert not breaker.allow()
+    # A failed trial opens the circuit again
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
+
+if __name__ == "__main__":
+    test_opens_after_consecutive_failures()
+    test_half_open_allows_one_trial()
+    print("All tests passed.")
@@ -0,0 +1,34 @@
+import sys
+import os
+import asyncio
+sys.path.append(os.getcwd())
+
+from src import dependencies
+
+def test_clients_are_shared_until_closed(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    first = dependencies.get_async_openai_client()
+    assert dependencies.get_async_openai_client() is first
+    assert dependencies.get_openai_client() is not first
+    assert first.max_retries == dependencies.OPENAI_MAX_RETRIES
+    assert first.timeout.read == dependencies.OPENAI_TIMEOUT
+
+    asyncio.run(dependencies.close_clients())
+    assert not dependencies._clients
+    second = dependencies.get_async_openai_client()
+    assert second is not first
+    asyncio.run(dependencies.close_clients())
+
+def test_qdrant_client_options():
+    kwargs = dependencies._qdrant_client_kwargs()
+    assert kwargs["prefer_grpc"] == dependencies.QDRANT_PREFER_GRPC
+    assert kwargs["grpc_port"] == dependencies.QDRANT_GRPC_PORT
+    # Keep-alive must be on; the async REST client disables it by default
+    assert kwargs["limits"].max_keepalive_connections == dependencies.HTTP_MAX_CONNECTIONS
+
+if __name__ == "__main__":
+    import pytest
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        test_clients_are_shared_until_closed(monkeypatch)
+    test_qdrant_client_options()
+    print("All tests passed.")
@@ -0,0 +1,62 @@
+import sys
+import os
+import asyncio
+sys.path.append(os.getcwd())
+
+import numpy as np
+from src.embedding import BatchingEmbedder
+
+class CountingModel:
+    def __init__(self):
+        self.batches = []
+
+    def encode(self, texts, convert_to_numpy=True):
+        self.batches.append(list(texts))
+        return np.array([[float(len(text)), 1.0] for text in texts], dtype=np.float32)
+
+def test_concurrent_requests_share_one_forward_pass():
+    model = CountingModel()
+    embedder = BatchingEmbedder(lambda: model, max_batch_size=64, max_wait_us=20000)
+
+    async def run():
+        return await asyncio.gather(
+            embedder.encode(["a", "bb"]),
+            embedder.encode(["ccc"]),
+            embedder.encode(["bb"]),
+        )
+
+    first, second, third = asyncio.run(run())
+    assert len(model.batches) == 1
+    assert model.batches[0] == ["a", "bb", "ccc"]  # "bb" deduplicated
+    assert first[:, 0].tolist() == [1.0, 2.0]
+    assert second[:, 0].tolist() == [3.0]
+    assert third[:, 0].tolist() == [2.0]
+    assert embedder.batch_sizes.snapshot()["count"] >= 1
+
+def test_max_batch_size_splits_batches():
+    model = CountingModel()
+    embedder = BatchingEmbedder(lambda: model, max_batch_size=2, max_wait_us=20000)
+
+    async def run():
+        return await asyncio.gather(*(embedder.encode([str(i) * (i + 1)]) for i in range(4)))
+
+    asyncio.run(run())
+    assert [len(batch) for batch in model.batches] == [2, 2]
+
+def test_errors_reach_every_caller():
+    class BrokenModel:
+        def encode(self, texts, convert_to_numpy=True):
+            raise RuntimeError("out of memory")
+
+    embedder = BatchingEmbedder(lambda: BrokenModel(), max_wait_us=5000)
+
+    async def run():
+        return await asyncio.gather(embedder.encode(["a"]), embedder.encode(["b"]), return_exceptions=True)
+
+    assert all(isinstance(result, RuntimeError) for result in asyncio.run(run()))
+
+if __name__ == "__main__":
+    test_concurrent_requests_share_one_forward_pass()
+    test_max_batch_size_splits_batches()
+    test_errors_reach_every_caller()
+    print("All tests passed.")
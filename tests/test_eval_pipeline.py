@@ -0,0 +1,33 @@
+import sys
+import os
+import json
+import asyncio
+import tempfile
+sys.path.append(os.getcwd())
+
+from src.agents.eval_agent import EvaluationAgent
+from src.eval_pipeline import EvaluationPipeline
+from src.models import RoadmapResponse, RoadmapNode
+
+def test_evaluations_are_persisted_in_background():
+    with tempfile.TemporaryDirectory() as tmp:
+        sink = os.path.join(tmp, "results.jsonl")
+
+        async def run():
+            pipeline = EvaluationPipeline(EvaluationAgent(), sink_path=sink)
+            for goal in ["Learn Python", "Learn Rust"]:
+                # submit() must not block on evaluation
+                pipeline.submit(RoadmapResponse(goal=goal, nodes=[RoadmapNode(id="a", title="A", description="a")]))
+            assert not os.path.exists(sink)
+            await pipeline.stop()
+
+        asyncio.run(run())
+
+        with open(sink, encoding="utf-8") as f:
+            records = [json.loads(line) for line in f]
+        assert [r["goal"] for r in records] == ["Learn Python", "Learn Rust"]
+        assert all("timestamp" in r and r["evaluation"]["metrics"]["node_count"] == 1 for r in records)
+
+if __name__ == "__main__":
+    test_evaluations_are_persisted_in_background()
+    print("All tests passed.")
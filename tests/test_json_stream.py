@@ -0,0 +1,40 @@
+import sys
+import os
+import json
+sys.path.append(os.getcwd())
+
+from src.json_stream import NodeStreamParser, parse_nodes
+
+CONTENT = json.dumps({
+    "title": "nodes",
+    "meta": {"nodes": [{"id": "not_a_node"}]},
+    "nodes": [
+        {"id": "basics", "title": "Basics {with [brackets]}", "description": 'Say "hi" and \\', "prerequisites": []},
+        {"id": "advanced", "title": "Advanced", "description": "More", "prerequisites": ["basics"], "extra": {"a": [1, {"b": 2}]}}
+    ]
+}, indent=2)
+
+def test_nodes_emitted_as_soon_as_they_close():
+    expected = json.loads(CONTENT)["nodes"]
+    parser = NodeStreamParser()
+    emitted_at = []
+    nodes = []
+    for position, char in enumerate(CONTENT):
+        for node in parser.feed(char):
+            nodes.append(node)
+            emitted_at.append(position)
+
+    assert nodes == expected
+    # The first node is available long before the document ends
+    assert emitted_at[0] < CONTENT.index('"advanced"')
+
+def test_parse_complete_and_invalid_content():
+    assert parse_nodes(CONTENT) == json.loads(CONTENT)["nodes"]
+    assert parse_nodes("not json") == []
+    # Nodes that closed before the output broke off are kept
+    assert [node["id"] for node in parse_nodes(CONTENT[:CONTENT.index('"advanced"')])] == ["basics"]
+
+if __name__ == "__main__":
+    test_nodes_emitted_as_soon_as_they_close()
+    test_parse_complete_and_invalid_content()
+    print("All tests passed.")
@@ -0,0 +1,50 @@
+import sys
+import os
+import tempfile
+sys.path.append(os.getcwd())
+
+from src.lexical import BM25Index, reciprocal_rank_fusion, tokenize
+from src.retrieval import SearchHit
+
+DOCS = [
+    "Kubernetes Helm charts: package and deploy applications with Helm",
+    "Kubernetes basics: pods, services and deployments",
+    "Docker for beginners: containers and images",
+    "CS50: Introduction to Computer Science",
+    "Sourdough starter guide",
+]
+
+def make_index():
+    return BM25Index.build(DOCS, [{"id": str(i), "title": doc} for i, doc in enumerate(DOCS)])
+
+def test_exact_terms_rank_first():
+    hits = make_index().search("Kubernetes Helm charts", limit=3)
+    assert hits[0].id == "0"
+    # "Kubernetes basics" only matches 1 of 3 terms, below the default coverage
+    assert [hit.id for hit in hits] == ["0"]
+    assert [hit.id for hit in make_index().search("CS50", limit=3)] == ["3"]
+
+def test_unknown_terms_return_nothing():
+    assert make_index().search("quantum chromodynamics", limit=3) == []
+    assert tokenize("Learn the Basics of C++") == ["basics", "c"]
+
+def test_save_and_load_roundtrip():
+    index = make_index()
+    with tempfile.TemporaryDirectory() as tmp:
+        index.save(tmp)
+        loaded = BM25Index.load(tmp)
+    assert [h.id for h in loaded.search("kubernetes", limit=5)] == [h.id for h in index.search("kubernetes", limit=5)]
+
+def test_reciprocal_rank_fusion():
+    dense = [SearchHit("a", 0.9, {}), SearchHit("b", 0.8, {}), SearchHit("c", 0.7, {})]
+    lexical = [SearchHit("c", 12.0, {}), SearchHit("d", 5.0, {})]
+    fused = reciprocal_rank_fusion([dense, lexical], limit=3)
+    # "c" appears in both lists and overtakes "a"
+    assert [hit.id for hit in fused] == ["c", "a", "b"]
+
+if __name__ == "__main__":
+    test_exact_terms_rank_first()
+    test_unknown_terms_return_nothing()
+    test_save_and_load_roundtrip()
+    test_reciprocal_rank_fusion()
+    print("All tests passed.")
@@ -0,0 +1,144 @@
+import sys
+import os
+import asyncio
+from types import SimpleNamespace
+sys.path.append(os.getcwd())
+
+from src.agents.roadmap_agent import RoadmapAgent
+from src.dependencies import create_async_openai_client
+from src.llm_backend import LLMBackend, LLMTimeoutError
+from src.llm_cache import LLMResponseCache
+from src.metrics import metrics
+from scripts.llm_stub_server import start_stub_server, ROADMAP
+
+class FakeStream:
+    def __init__(self, chunks, delay):
+        self.chunks = list(chunks)
+        self.delay = delay
+        self.closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        await asyncio.sleep(self.delay)
+        self.delay = 0
+        if not self.chunks:
+            raise StopAsyncIteration
+        return self.chunks.pop(0)
+
+    async def close(self):
+        self.closed = True
+
+class FakeCreate:
+    """Call i waits delays[i] before its first chunk and streams its own label."""
+    def __init__(self, delays, error=None):
+        self.delays = delays
+        self.error = error
+        self.streams = []
+
+    async def __call__(self, **request):
+        index = len(self.streams)
+        stream = FakeStream([f"call-{index}", "done"], self.delays[min(index, len(self.delays) - 1)])
+        self.streams.append(stream)
+        if self.error is not None:
+            raise self.error
+        return stream
+
+def make_backend(create, **options):
+    return LLMBackend(client=SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create))),
+                      model="stub", backoff=0, **options)
+
+async def collect(stream):
+    return [chunk async for chunk in stream]
+
+async def collect_created(backend):
+    return await collect(await backend.create(messages=[], stream=True))
+
+def test_attempt_timeout_is_retried():
+    create = FakeCreate([1.0, 0.0])
+    backend = make_backend(create, attempt_timeout=0.05, max_attempts=2)
+    retries = metrics.counter("llm_retries_total").value
+
+    chunks = asyncio.run(collect_created(backend))
+    assert chunks == ["call-1", "done"]
+    assert metrics.counter("llm_retries_total").value == retries + 1
+
+    backend = make_backend(FakeCreate([1.0]), attempt_timeout=0.05, max_attempts=2)
+    try:
+        asyncio.run(backend.create(messages=[], stream=True))
+        assert False, "expected a timeout"
+    except LLMTimeoutError:
+        pass
+
+def test_non_retryable_error_is_raised():
+    create = FakeCreate([0.0], error=ValueError("bad request"))
+    backend = make_backend(create, max_attempts=3)
+    try:
+        asyncio.run(backend.create(messages=[], stream=True))
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+    assert len(create.streams) == 1
+
+def test_hedge_takes_first_response():
+    # The first attempt stalls past the learned p95, so a hedged second request wins
+    create = FakeCreate([1.0, 0.0])
+    backend = make_backend(create, hedge=True, attempt_timeout=5)
+    for _ in range(backend.latencies.min_samples):
+        backend.latencies.observe(0.02)
+    wins = metrics.counter("llm_hedge_wins_total").value
+
+    chunks = asyncio.run(collect_created(backend))
+    assert chunks == ["call-1", "done"]
+    assert metrics.counter("llm_hedge_wins_total").value == wins + 1
+    assert create.streams[0].closed  # the losing request was released
+
+    # Without enough samples there is nothing to hedge against
+    create = FakeCreate([0.1, 0.0])
+    backend = make_backend(create, hedge=True)
+    assert asyncio.run(collect_created(backend)) == ["call-0", "done"]
+    assert len(create.streams) == 1
+
+def test_non_streamed_request_uses_request_timeout():
+    calls = []
+
+    async def create(**request):
+        calls.append(request)
+        # A slow local model: the whole completion takes longer than the first-token limit
+        await asyncio.sleep(0.1)
+        return "completion"
+
+    backend = make_backend(create, attempt_timeout=0.05, request_timeout=1, max_attempts=1, hedge=True)
+    for _ in range(backend.latencies.min_samples):
+        backend.latencies.observe(0.01)
+    assert asyncio.run(backend.create(messages=[])) == "completion"
+    # Not hedged, and the SDK gets the longer timeout too
+    assert len(calls) == 1 and calls[0]["timeout"] == 1
+
+def test_roadmap_agent_against_stub_server():
+    server, base_url = start_stub_server(latency=0.01)
+    try:
+        async def run():
+            client = create_async_openai_client(base_url=base_url, api_key="test")
+            agent = RoadmapAgent(backend=LLMBackend(client=client.with_options(max_retries=0), model="stub"), llm_cache_path=None)
+            agent.llm_cache = LLMResponseCache(None, mode="off")
+            try:
+                return await agent.generate_structure("Learn Git")
+            finally:
+                await client.close()
+
+        prompt_tokens = metrics.counter("llm_prompt_tokens_total").value
+        nodes = asyncio.run(run())
+        assert nodes == ROADMAP["nodes"]
+        assert metrics.counter("llm_prompt_tokens_total").value > prompt_tokens
+    finally:
+        server.shutdown()
+
+if __name__ == "__main__":
+    test_attempt_timeout_is_retried()
+    test_non_retryable_error_is_raised()
+    test_hedge_takes_first_response()
+    test_non_streamed_request_uses_request_timeout()
+    test_roadmap_agent_against_stub_server()
+    print("All tests passed.")
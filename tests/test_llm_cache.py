@@ -0,0 +1,125 @@
+import sys
+import os
+import asyncio
+import tempfile
+from types import SimpleNamespace
+sys.path.append(os.getcwd())
+
+from src.llm_backend import LLMBackend
+from src.llm_cache import LLMResponseCache, LLMCacheMiss, request_key
+from src.agents.roadmap_agent import RoadmapAgent
+
+MESSAGES = [{"role": "system", "content": "You are an expert curriculum designer."}, {"role": "user", "content": "Git"}]
+
+class FakeCreate:
+    """Stand-in for client.chat.completions.create(stream=True) that counts calls."""
+    def __init__(self, content='{"nodes": [{"id": "basics"}]}'):
+        self.content = content
+        self.calls = 0
+
+    async def __call__(self, **request):
+        assert request["stream"]
+        self.calls += 1
+
+        async def chunks():
+            for i in range(0, len(self.content), 5):
+                yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=self.content[i:i + 5]))])
+
+        return chunks()
+
+def test_request_key():
+    key = request_key("gpt-4o", MESSAGES, {"type": "json_object"})
+    assert key == request_key("gpt-4o", [dict(reversed(list(m.items()))) for m in MESSAGES], {"type": "json_object"})
+    assert key != request_key("gpt-4o-mini", MESSAGES, {"type": "json_object"})
+    assert key != request_key("gpt-4o", MESSAGES)
+
+def test_cache_mode_and_bypass():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "llm.sqlite")
+        create = FakeCreate()
+
+        async def run():
+            cache = LLMResponseCache(path)
+            first = await cache.complete(create, "gpt-4o", MESSAGES)
+            second = await cache.complete(create, "gpt-4o", MESSAGES)
+            await cache.complete(create, "gpt-4o", MESSAGES, bypass=True)
+            # A new process is served from disk
+            third = await LLMResponseCache(path).complete(create, "gpt-4o", MESSAGES)
+            return first, second, third
+
+        first, second, third = asyncio.run(run())
+        assert first == second == third
+        assert create.calls == 2
+
+def test_record_then_replay_offline():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "llm.sqlite")
+        create = FakeCreate()
+
+        async def run():
+            await LLMResponseCache(path, mode="record").complete(create, "gpt-4o", MESSAGES)
+            replay = LLMResponseCache(path, mode="replay")
+            content = await replay.complete(create, "gpt-4o", MESSAGES)
+            try:
+                await replay.complete(create, "gpt-4o", MESSAGES + [{"role": "user", "content": "more"}])
+            except LLMCacheMiss:
+                return content, True
+            return content, False
+
+        content, missed = asyncio.run(run())
+        assert content == create.content and missed
+        assert create.calls == 1
+
+def test_roadmap_agent_uses_cache():
+    with tempfile.TemporaryDirectory() as tmp:
+        create = FakeCreate()
+
+        async def run():
+            agent = RoadmapAgent(llm_cache_path=None)
+            agent.llm_cache = LLMResponseCache(os.path.join(tmp, "llm.sqlite"))
+            agent.backend = LLMBackend(client=SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create))))
+            return await agent.generate_structure("Learn Git"), await agent.generate_structure("Learn Git")
+
+        first, second = asyncio.run(run())
+        assert first == second == [{"id": "basics"}]
+        assert create.calls == 1
+
+def test_stream_yields_deltas_and_stores_full_output():
+    with tempfile.TemporaryDirectory() as tmp:
+        create = FakeCreate()
+
+        async def run():
+            cache = LLMResponseCache(os.path.join(tmp, "llm.sqlite"))
+            streamed = [delta async for delta in cache.stream(create, "gpt-4o", MESSAGES)]
+            cached = [delta async for delta in cache.stream(create, "gpt-4o", MESSAGES)]
+            return streamed, cached
+
+        streamed, cached = asyncio.run(run())
+        assert len(streamed) > 1 and "".join(streamed) == create.content
+        assert cached == [create.content]
+        assert create.calls == 1
+
+def test_truncated_output_is_not_cached():
+    truncated = '{"nodes": [{"id": "a", "title": "A", "desc'
+    with tempfile.TemporaryDirectory() as tmp:
+        create = FakeCreate(truncated)
+
+        async def run():
+            agent = RoadmapAgent(llm_cache_path=None)
+            agent.llm_cache = LLMResponseCache(os.path.join(tmp, "llm.sqlite"))
+            agent.backend = LLMBackend(client=SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create))))
+            return await agent.generate_structure("Learn Git"), await agent.generate_structure("Learn Git")
+
+        first, second = asyncio.run(run())
+        assert first == second == []
+        # The second call went back to the LLM instead of replaying the broken output
+        assert create.calls == 2
+
+if __name__ == "__main__":
+    test_request_key()
+    test_cache_mode_and_bypass()
+    test_record_then_replay_offline()
+    test_roadmap_agent_uses_cache()
+    test_stream_yields_deltas_and_stores_full_output()
+    test_truncated_output_is_not_cached()
+    print("All tests passed.")
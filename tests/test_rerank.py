@@ -0,0 +1,60 @@
+import sys
+import os
+import time
+import asyncio
+sys.path.append(os.getcwd())
+
+from src.rerank import CrossEncoderReranker
+from src.retrieval import SearchHit
+
+class FakeCrossEncoder:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = []
+
+    def predict(self, pairs, batch_size=64, show_progress_bar=False):
+        self.calls.append(list(pairs))
+        time.sleep(self.delay)
+        # Prefer documents that share more words with the query
+        return [len(set(query.lower().split()) & set(doc.lower().split())) for query, doc in pairs]
+
+def hit(doc_id, title):
+    return SearchHit(doc_id, 0.5, {"title": title, "description": ""})
+
+QUERIES = ["helm charts", "git basics"]
+HITS = [
+    [hit("1", "Kubernetes intro"), hit("2", "Helm charts deep dive")],
+    [hit("3", "Git basics"), hit("4", "GitHub Actions")],
+]
+
+def test_one_batched_pass_and_pair_cache():
+    reranker = CrossEncoderReranker("fake", budget_ms=1000)
+    reranker._model = FakeCrossEncoder()
+
+    first = asyncio.run(reranker.rerank_batch(QUERIES, HITS, limit=1))
+    second = asyncio.run(reranker.rerank_batch(QUERIES, HITS, limit=1))
+
+    assert [[h.id for h in hits] for hits in first] == [["2"], ["3"]]
+    assert first == second
+    # All pairs of all nodes in one predict call; the repeat is fully cached
+    assert len(reranker._model.calls) == 1 and len(reranker._model.calls[0]) == 4
+
+def test_budget_exceeded_keeps_retrieval_order():
+    reranker = CrossEncoderReranker("fake", budget_ms=10)
+    reranker._model = FakeCrossEncoder(delay=0.2)
+
+    async def run():
+        result = await reranker.rerank_batch(QUERIES, HITS, limit=1)
+        # Let the late scores land in the cache
+        await asyncio.sleep(0.3)
+        return result
+
+    result = asyncio.run(run())
+    assert [[h.id for h in hits] for hits in result] == [["1"], ["3"]]
+    assert reranker.budget_exceeded.value >= 1
+    assert reranker.pair_cache.get(("helm charts", "2")) == 2
+
+if __name__ == "__main__":
+    test_one_batched_pass_and_pair_cache()
+    test_budget_exceeded_keeps_retrieval_order()
+    print("All tests passed.")
@@ -0,0 +1,307 @@
+import sys
+import os
+sys.path.append(os.getcwd())
+
+import asyncio
+import tempfile
+import numpy as np
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.models import Distance, VectorParams, PointStruct
+
+from src.agents import resource_agent
+from src.agents.resource_agent import ResourceAgent
+from src.circuit_breaker import CircuitBreaker
+from src.lexical import BM25Index
+from src.cache import SQLiteCache
+from src.retrieval import QdrantBackend
+from src.dependencies import COLLECTION_NAME
+from src.models import Resource
+
+class FakeModel:
+    """Deterministic stand-in for SentenceTransformer that counts encode calls."""
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts, convert_to_numpy=True):
+        self.calls.append(list(texts))
+        return np.array([self.vector(text) for text in texts], dtype=np.float32)
+
+    @staticmethod
+    def vector(text):
+        return [1.0, 0.0] if "python" in text.lower() else [0.0, 1.0]
+
+async def make_agent():
+    # Tests that need a web cache give it a temporary file; never touch data/cache
+    agent = ResourceAgent(web_cache_path=None)
+    client = AsyncQdrantClient(location=":memory:")
+    agent.backend = QdrantBackend(client, COLLECTION_NAME)
+    await client.create_collection(
+        collection_name=COLLECTION_NAME,
+        vectors_config=VectorParams(size=2, distance=Distance.COSINE),
+    )
+    await client.upsert(
+        collection_name=COLLECTION_NAME,
+        points=[
+            PointStruct(id=i, vector=[1.0, 0.0], payload={"title": f"Python {i}", "url": f"https://example.com/{i}", "description": "py"})
+            for i in range(3)
+        ]
+    )
+    agent._model = FakeModel()
+    async def fake_web(query, max_results):
+        return [agent._search_link(query, "web")] * max_results
+
+    agent.search_web = fake_web
+    return agent
+
+def test_find_resources_batch():
+    async def run():
+        agent = await make_agent()
+        queries = ["Python: basics", "Baking: bread", "Python: basics"]
+        return agent, await agent.find_resources_batch(queries, limit=3)
+
+    agent, results = asyncio.run(run())
+
+    # One encode call, duplicates dropped
+    assert agent._model.calls == [["Python: basics", "Baking: bread"]]
+    assert len(results) == 3
+    assert all(res.type != "Search Link" for res in results[0])
+    assert all(res.type == "Search Link" for res in results[1])
+    assert [r.id for r in results[0]] == [r.id for r in results[2]]
+
+def test_find_resources_single_query():
+    async def run():
+        agent = await make_agent()
+        return await agent.find_resources("Python: basics", limit=2)
+
+    results = asyncio.run(run())
+    assert len(results) == 2
+
+def test_web_fallback_concurrency_and_order():
+    active = [0]
+    peak = [0]
+
+    async def run():
+        agent = await make_agent()
+
+        async def slow_web(query, max_results):
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+            # Later queries finish first to check ordering
+            await asyncio.sleep(0.01 * (6 - int(query.split()[1][0])))
+            active[0] -= 1
+            return [agent._search_link(query, "web")]
+
+        agent.search_web = slow_web
+        return await agent.find_resources_batch(queries, limit=1, max_concurrency=2)
+
+    queries = [f"Topic {i}: niche" for i in range(6)]
+    results = asyncio.run(run())
+
+    assert peak[0] == 2
+    assert [res[0].title for res in results] == [f"Search Google for '{q}'" for q in queries]
+
+def test_iter_resources_batch_yields_local_hits_first():
+    async def run():
+        agent = await make_agent()
+
+        async def slow_web(query, max_results):
+            await asyncio.sleep(0.05)
+            return [agent._search_link(query, "web")] * max_results
+
+        agent.search_web = slow_web
+        queries = ["Baking: bread", "Python: basics"]
+        return [index async for index, _ in agent.iter_resources_batch(queries, limit=3)]
+
+    assert asyncio.run(run()) == [1, 0]
+
+def test_query_embedding_cache():
+    async def run():
+        agent = await make_agent()
+        first = await agent.encode(["Python: basics", "Baking: bread"])
+        second = await agent.encode(["Baking: bread", "Git: basics", "Python: basics"])
+        return agent, first, second
+
+    agent, first, second = asyncio.run(run())
+    assert agent._model.calls == [["Python: basics", "Baking: bread"], ["Git: basics"]]
+    assert second.dtype == np.float32
+    assert np.array_equal(second[0], first[1]) and np.array_equal(second[2], first[0])
+    assert agent.embedding_cache.stats()["hits"] == 2
+
+def test_web_search_cache_with_negative_entries():
+    class FakeDDGS:
+        def __init__(self):
+            self.searches = []
+
+        def text(self, search, max_results):
+            self.searches.append(search)
+            if "tutorial course" in search:
+                return []
+            return [{"title": "Glazing 101", "href": "https://example.com/glaze", "body": "Glazes"}]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        async def run():
+            agent = await make_agent()
+            agent.ddgs = FakeDDGS()
+            agent.web_cache = SQLiteCache(os.path.join(tmp, "web.sqlite"))
+            first = await ResourceAgent.search_web(agent, "Pottery Glazing", 2)
+            second = await ResourceAgent.search_web(agent, "Pottery Glazing", 2)
+            agent.web_cache.close()
+            return agent, first, second
+
+        agent, first, second = asyncio.run(run())
+
+    # Both the empty "tutorial course" search and the broadened one are served from cache
+    assert sorted(agent.ddgs.searches) == ["Pottery Glazing", "Pottery Glazing tutorial course"]
+    assert first == second and first[0].title == "Glazing 101"
+
+def test_broadened_web_search_is_delayed_and_cached():
+    import time
+
+    class SlowDDGS:
+        def __init__(self, delay):
+            self.delay = delay
+            self.searches = []
+
+        def text(self, search, max_results):
+            self.searches.append(search)
+            time.sleep(self.delay)
+            return [{"title": search, "href": "https://example.com", "body": ""}]
+
+    original = resource_agent.WEB_BROADEN_DELAY
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            async def run(delay, broaden_delay):
+                resource_agent.WEB_BROADEN_DELAY = broaden_delay
+                agent = await make_agent()
+                agent.ddgs = SlowDDGS(delay)
+                agent.web_cache = SQLiteCache(os.path.join(tmp, f"web{delay}.sqlite"))
+                results = await ResourceAgent.search_web(agent, "Pottery Glazing", 2)
+                # Wait for a losing search thread to finish and store its results
+                cached = None
+                for _ in range(100):
+                    cached = agent.web_cache.get("2|Pottery Glazing")
+                    if cached is not None or len(agent.ddgs.searches) < 2:
+                        break
+                    await asyncio.sleep(0.05)
+                agent.web_cache.close()
+                return agent.ddgs.searches, results, cached
+
+            # A specific search that answers within the delay never triggers the broadened one
+            searches, results, _ = asyncio.run(run(0.0, broaden_delay=5))
+            assert searches == ["Pottery Glazing tutorial course"]
+            assert results[0].title == "Pottery Glazing tutorial course"
+
+            # A slow one is hedged; the losing broadened search still lands in the cache
+            searches, results, cached = asyncio.run(run(0.2, broaden_delay=0.05))
+            assert sorted(searches) == ["Pottery Glazing", "Pottery Glazing tutorial course"]
+            assert results[0].title == "Pottery Glazing tutorial course"
+            assert cached[0]["title"] == "Pottery Glazing"
+    finally:
+        resource_agent.WEB_BROADEN_DELAY = original
+
+def test_node_resource_cache_across_roadmaps():
+    async def run():
+        agent = await make_agent()
+        web_queries = []
+
+        async def fake_web(query, max_results):
+            web_queries.append(query)
+            return [Resource(title="Bread", url="https://example.com/bread", description="", type="Web Resource")] * max_results
+
+        agent.search_web = fake_web
+        first = await agent.find_resources_batch(["Python: basics", "Baking: bread"], limit=3)
+        second = await agent.find_resources_batch(["baking: bread", "Python: Basics", "Git: basics"], limit=3)
+        return agent, web_queries, first, second
+
+    agent, web_queries, first, second = asyncio.run(run())
+    # Only the node not seen before is searched again
+    assert agent._model.calls == [["Python: basics", "Baking: bread"], ["Git: basics"]]
+    assert web_queries == ["Baking: bread", "Git: basics"]
+    assert second[0] == first[1] and second[1] == first[0]
+    assert agent.resource_cache.stats()["hits"] == 2
+
+def test_speculative_web_search_overlaps_local_search():
+    events = []
+
+    async def run():
+        agent = await make_agent()
+        payloads = [{"id": str(i), "title": f"Python {i}", "url": f"https://example.com/{i}"} for i in range(3)]
+        agent.lexical_index = BM25Index.build([f"Python {i} basics" for i in range(3)], payloads)
+        search_batch = agent.backend.search_batch
+
+        async def slow_search_batch(*args, **kwargs):
+            await asyncio.sleep(0.05)
+            events.append("local done")
+            return await search_batch(*args, **kwargs)
+
+        async def fake_web(query, max_results):
+            events.append(f"web {query}")
+            return [agent._search_link(query, "web")] * max_results
+
+        agent.backend.search_batch = slow_search_batch
+        agent.search_web = fake_web
+        return await agent.find_resources_batch(["Python: basics", "Baking: bread"], limit=3)
+
+    results = asyncio.run(run())
+    # Only the query without keyword matches is searched, and before the local search returns
+    assert events == ["web Baking: bread", "local done"]
+    assert all(res.type != "Search Link" for res in results[0])
+    assert len(results[1]) == 3
+
+def test_node_deadline():
+    async def run():
+        agent = await make_agent()
+
+        async def hanging_web(query, max_results):
+            await asyncio.sleep(5)
+
+        agent.search_web = hanging_web
+        start = asyncio.get_running_loop().time()
+        results = await agent.find_resources_batch(["Baking: bread"], limit=3)
+        return results, asyncio.get_running_loop().time() - start
+
+    deadline = resource_agent.NODE_DEADLINE
+    resource_agent.NODE_DEADLINE = 0.1
+    try:
+        results, elapsed = asyncio.run(run())
+    finally:
+        resource_agent.NODE_DEADLINE = deadline
+    assert elapsed < 1
+    assert results[0][0].type == "Search Link" and "too long" in results[0][0].description
+
+def test_web_circuit_breaker_skips_failing_ddg():
+    class FailingDDGS:
+        def __init__(self):
+            self.searches = []
+
+        def text(self, search, max_results):
+            self.searches.append(search)
+            raise RuntimeError("rate limited")
+
+    async def run():
+        agent = await make_agent()
+        agent.ddgs = FailingDDGS()
+        agent.web_breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        first = await ResourceAgent.search_web(agent, "Pottery Glazing", 2)
+        second = await ResourceAgent.search_web(agent, "Knitting", 2)
+        return agent, first, second
+
+    agent, first, second = asyncio.run(run())
+    assert len(agent.ddgs.searches) == 2
+    assert agent.web_breaker.state == "open"
+    assert first[0].type == second[0].type == "Search Link"
+    assert "temporarily unavailable" in second[0].description
+
+if __name__ == "__main__":
+    test_find_resources_batch()
+    test_find_resources_single_query()
+    test_web_fallback_concurrency_and_order()
+    test_iter_resources_batch_yields_local_hits_first()
+    test_query_embedding_cache()
+    test_web_search_cache_with_negative_entries()
+    test_broadened_web_search_is_delayed_and_cached()
+    test_node_resource_cache_across_roadmaps()
+    test_speculative_web_search_overlaps_local_search()
+    test_node_deadline()
+    test_web_circuit_breaker_skips_failing_ddg()
+    print("All tests passed.")
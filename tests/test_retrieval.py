@@ -0,0 +1,131 @@
+import sys
+import os
+import asyncio
+import tempfile
+sys.path.append(os.getcwd())
+
+import numpy as np
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.models import Distance, VectorParams, PointStruct
+
+from src.collection_profiles import PROFILES, QUERY_PAYLOAD_FIELDS, build_collection_config, build_search_params, create_payload_indexes
+from src.retrieval import EmbeddedIndexBackend, QdrantBackend, write_embedded_index, HNSW_FILE
+
+def make_corpus(n=200, dim=16, seed=0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.normal(size=(n, dim)).astype(np.float32)
+    payloads = [{"id": str(i), "title": f"Item {i}", "url": f"https://example.com/{i}", "description": "d"} for i in range(n)]
+    return vectors, payloads
+
+async def qdrant_results(vectors, payloads, queries, limit, threshold):
+    client = AsyncQdrantClient(location=":memory:")
+    await client.create_collection("test", vectors_config=VectorParams(size=vectors.shape[1], distance=Distance.COSINE))
+    await client.upsert("test", points=[
+        PointStruct(id=i, vector=vector.tolist(), payload=payload)
+        for i, (vector, payload) in enumerate(zip(vectors, payloads))
+    ])
+    return await QdrantBackend(client, "test").search_batch(queries, limit=limit, score_threshold=threshold)
+
+def test_embedded_index_matches_qdrant():
+    vectors, payloads = make_corpus()
+    queries = vectors[:5] + 0.3 * np.random.default_rng(1).normal(size=(5, vectors.shape[1])).astype(np.float32)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        write_embedded_index(tmp, vectors, payloads)
+        backend = EmbeddedIndexBackend(tmp)
+        embedded = asyncio.run(backend.search_batch(queries, limit=5, score_threshold=0.4))
+
+    expected = asyncio.run(qdrant_results(vectors, payloads, queries, limit=5, threshold=0.4))
+    for got, want in zip(embedded, expected):
+        assert [hit.id for hit in got] == [hit.id for hit in want]
+        assert np.allclose([hit.score for hit in got], [hit.score for hit in want], atol=1e-4)
+
+def test_float16_index_and_threshold():
+    vectors, payloads = make_corpus(n=50)
+    with tempfile.TemporaryDirectory() as tmp:
+        write_embedded_index(tmp, vectors, payloads, dtype="float16")
+        backend = EmbeddedIndexBackend(tmp)
+        assert backend.matrix.dtype == np.float16
+        hits = backend.search_batch_sync(vectors[:1], limit=3, score_threshold=0.99)[0]
+
+    # Only the query's own item clears a 0.99 threshold
+    assert [hit.id for hit in hits] == ["0"]
+    assert hits[0].payload["title"] == "Item 0"
+
+def test_hnsw_without_graph_falls_back_to_exact_search():
+    vectors, payloads = make_corpus(n=50)
+    with tempfile.TemporaryDirectory() as tmp:
+        # A graph from an earlier build doesn't survive a rewrite of the vectors
+        open(os.path.join(tmp, HNSW_FILE), "wb").close()
+        write_embedded_index(tmp, vectors, payloads)
+        assert not os.path.exists(os.path.join(tmp, HNSW_FILE))
+
+        backend = EmbeddedIndexBackend(tmp, use_hnsw=True)
+        assert backend.hnsw is None
+        hits = backend.search_batch_sync(vectors[:1], limit=3, score_threshold=0.99)[0]
+    assert [hit.id for hit in hits] == ["0"]
+
+def test_collection_profiles_search_with_payload_fields():
+    vectors, payloads = make_corpus(n=50)
+    for payload in payloads:
+        payload.update(snippet="short", source="test", content_type="course", quality_score=0.5)
+
+    async def search(profile):
+        client = AsyncQdrantClient(location=":memory:")
+        config = build_collection_config(profile, vector_size=vectors.shape[1])
+        await client.create_collection("test", **config)
+        await client.upsert("test", points=[
+            PointStruct(id=i, vector=vector.tolist(), payload=payload)
+            for i, (vector, payload) in enumerate(zip(vectors, payloads))
+        ])
+        backend = QdrantBackend(client, "test", search_params=build_search_params(profile), payload_fields=["title", "snippet"])
+        return await backend.search_batch(vectors[:2], limit=3, score_threshold=0.0)
+
+    for name, profile in PROFILES.items():
+        results = asyncio.run(search(profile))
+        assert [hits[0].id for hits in results] == ["0", "1"], name
+        # Only the requested payload fields come back
+        assert set(results[0][0].payload) == {"title", "snippet"}
+
+def test_collection_without_snippets_falls_back_to_description():
+    vectors, payloads = make_corpus(n=10)
+    for i, payload in enumerate(payloads):
+        payload.update(description=f"Description {i}", content_type="course")
+
+    async def search():
+        client = AsyncQdrantClient(location=":memory:")
+        await client.create_collection("test", vectors_config=VectorParams(size=vectors.shape[1], distance=Distance.COSINE))
+        await client.upsert("test", points=[
+            PointStruct(id=i, vector=vector.tolist(), payload=payload)
+            for i, (vector, payload) in enumerate(zip(vectors, payloads))
+        ])
+        backend = QdrantBackend(client, "test", payload_fields=QUERY_PAYLOAD_FIELDS)
+        first = await backend.search_batch(vectors[:1], limit=2, score_threshold=0.0)
+        second = await backend.search_batch(vectors[1:2], limit=2, score_threshold=0.0)
+        return first, second
+
+    first, second = asyncio.run(search())
+    assert first[0][0].payload["description"] == "Description 0"
+    # Later searches ask for the description directly
+    assert second[0][0].payload["description"] == "Description 1"
+
+def test_create_payload_indexes():
+    calls = []
+
+    class RecordingClient:
+        def create_payload_index(self, **kwargs):
+            calls.append(kwargs["field_name"])
+
+    create_payload_indexes(RecordingClient(), "test")
+    assert calls == ["source", "content_type", "quality_score"]
+    assert build_search_params(PROFILES["default"]) is None
+    assert build_search_params(PROFILES["low_memory"]).quantization.oversampling == 3.0
+
+if __name__ == "__main__":
+    test_embedded_index_matches_qdrant()
+    test_float16_index_and_threshold()
+    test_hnsw_without_graph_falls_back_to_exact_search()
+    test_collection_profiles_search_with_payload_fields()
+    test_collection_without_snippets_falls_back_to_description()
+    test_create_payload_indexes()
+    print("All tests passed.")
@@ -0,0 +1,145 @@
+import sys
+import os
+import json
+import asyncio
+from types import SimpleNamespace
+sys.path.append(os.getcwd())
+
+from src.agents.roadmap_agent import RoadmapAgent, COMPACT_SYSTEM_PROMPT, roadmap_order
+from src.llm_backend import LLMBackend
+from src.llm_cache import LLMResponseCache
+from src.metrics import metrics
+
+STAGES = {"nodes": [
+    {"id": "frontend", "title": "Frontend", "description": "Browsers", "prerequisites": []},
+    {"id": "backend", "title": "Backend", "description": "Servers", "prerequisites": []},
+    {"id": "deploy", "title": "Deployment", "description": "Shipping", "prerequisites": ["frontend", "backend"]},
+]}
+
+SUB_ROADMAPS = {
+    "Frontend": {"nodes": [
+        {"id": "html", "title": "HTML", "description": "Markup", "prerequisites": []},
+        {"id": "react", "title": "React", "description": "Components", "prerequisites": ["html", "javascript"]},
+    ]},
+    "Backend": {"nodes": [
+        {"id": "basics", "title": "HTTP", "description": "Requests", "prerequisites": []},
+        {"id": "sql", "title": "SQL", "description": "Databases", "prerequisites": ["basics"]},
+        {"id": "apis", "title": "APIs", "description": "REST", "prerequisites": ["basics"]},
+    ]},
+    "Deployment": {"nodes": [
+        {"id": "basics", "title": "Docker", "description": "Containers", "prerequisites": []},
+    ]},
+}
+
+class FakeCreate:
+    """
+    Streams a canned JSON answer per prompt. Sub-roadmaps record ("start"/"finish", stage) and
+    only finish once every stage has started (or after a second, if they are never concurrent).
+    """
+    def __init__(self, failing_stage=None):
+        self.failing_stage = failing_stage
+        self.events = []
+        self.all_started = asyncio.Event()
+
+    async def __call__(self, messages, stream, **request):
+        prompt = messages[-1]["content"]
+        if "top-level learning stages" in prompt:
+            content = STAGES
+        else:
+            title = next(title for title in SUB_ROADMAPS if f'stage "{title}"' in prompt)
+            self.events.append(("start", title))
+            if sum(kind == "start" for kind, _ in self.events) == len(SUB_ROADMAPS):
+                self.all_started.set()
+            if title == self.failing_stage:
+                raise RuntimeError("rate limited")
+            try:
+                await asyncio.wait_for(self.all_started.wait(), 1)
+            except asyncio.TimeoutError:
+                pass
+            self.events.append(("finish", title))
+            content = SUB_ROADMAPS[title]
+        text = json.dumps(content)
+
+        async def chunks():
+            for i in range(0, len(text), 16):
+                yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text[i:i + 16]))])
+
+        return chunks()
+
+def make_agent(failing_stage=None):
+    agent = RoadmapAgent(llm_cache_path=None)
+    agent.llm_cache = LLMResponseCache(None, mode="off")
+    agent.backend = LLMBackend(client=SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=FakeCreate(failing_stage)))))
+    return agent
+
+def test_hierarchical_structure_merges_stages():
+    async def run():
+        agent = make_agent()
+        nodes = [node async for node in agent.stream_hierarchical_structure("Full-stack engineer")]
+        return nodes, agent.backend.client.chat.completions.create.events
+
+    nodes, events = asyncio.run(run())
+    by_id = {node["id"]: node for node in nodes}
+
+    # Stages are expanded concurrently, not one after another: all of them start before any finishes
+    first_finish = events.index(next(event for event in events if event[0] == "finish"))
+    assert sorted(title for kind, title in events[:first_finish]) == sorted(SUB_ROADMAPS)
+    assert len(nodes) == 6 and len(by_id) == 6
+    # In-stage prerequisites are namespaced, dangling ones dropped
+    assert by_id["frontend/react"]["prerequisites"] == ["frontend/html"]
+    assert by_id["backend/sql"]["prerequisites"] == ["backend/basics"]
+    # Cross-stage: the deployment entry node depends on the last nodes of both prerequisite stages
+    assert by_id["deploy/basics"]["prerequisites"] == ["frontend/react", "backend/sql", "backend/apis"]
+    assert by_id["frontend/html"]["prerequisites"] == []
+    # Arrival order is interleaved across stages; roadmap order is by stage, then within the stage
+    assert [nodes[i]["id"] for i in roadmap_order(nodes)] == [
+        "frontend/html", "frontend/react", "backend/basics", "backend/sql", "backend/apis", "deploy/basics"
+    ]
+
+def test_failed_stage_falls_back_to_stage_node():
+    async def run():
+        return [node async for node in make_agent(failing_stage="Backend").stream_hierarchical_structure("Full-stack engineer")]
+
+    by_id = {node["id"]: node for node in asyncio.run(run())}
+    assert by_id["backend/backend"]["title"] == "Backend"
+    assert by_id["deploy/basics"]["prerequisites"] == ["frontend/react", "backend/backend"]
+
+def test_compact_profile_and_token_accounting():
+    requests = []
+
+    async def create(**request):
+        requests.append(request)
+        text = json.dumps(SUB_ROADMAPS["Backend"])
+
+        async def chunks():
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))], usage=None)
+            # With include_usage the last chunk carries the usage and no choices
+            yield SimpleNamespace(choices=[], usage=SimpleNamespace(
+                prompt_tokens=300, completion_tokens=120, prompt_tokens_details=SimpleNamespace(cached_tokens=256)
+            ))
+
+        return chunks()
+
+    agent = RoadmapAgent(prompt_profile="compact", llm_cache_path=None)
+    agent.llm_cache = LLMResponseCache(None, mode="off")
+    agent.backend = LLMBackend(client=SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create))))
+    before = {name: metrics.counter(name).value for name in ("llm_prompt_tokens_total", "llm_cached_prompt_tokens_total", "llm_completion_tokens_total")}
+
+    nodes = asyncio.run(agent.generate_structure("Learn Backend"))
+
+    assert [node["id"] for node in nodes] == ["basics", "sql", "apis"]
+    # Static instructions first, only the goal varies
+    assert requests[0]["messages"] == [
+        {"role": "system", "content": COMPACT_SYSTEM_PROMPT},
+        {"role": "user", "content": 'Goal: "Learn Backend"'}
+    ]
+    assert requests[0]["stream_options"] == {"include_usage": True}
+    assert metrics.counter("llm_prompt_tokens_total").value - before["llm_prompt_tokens_total"] == 300
+    assert metrics.counter("llm_cached_prompt_tokens_total").value - before["llm_cached_prompt_tokens_total"] == 256
+    assert metrics.counter("llm_completion_tokens_total").value - before["llm_completion_tokens_total"] == 120
+
+if __name__ == "__main__":
+    test_hierarchical_structure_merges_stages()
+    test_failed_stage_falls_back_to_stage_node()
+    test_compact_profile_and_token_accounting()
+    print("All tests passed.")
@@ -0,0 +1,166 @@
+import sys
+import os
+import asyncio
+import numpy as np
+sys.path.append(os.getcwd())
+
+from src.models import Resource
+from src.agents.resource_agent import ResourceAgent
+from src.agents.roadmap_agent import RoadmapAgent
+from src.roadmap_engine import RoadmapEngine
+
+NODES = [
+    {"id": f"step_{i}", "title": f"Step {i}", "description": f"Topic {i}", "prerequisites": [f"step_{i - 1}"] if i else []}
+    for i in range(3)
+]
+
+class FakeModel:
+    """Stand-in for SentenceTransformer (used by the semantic goal cache)."""
+    def encode(self, texts, convert_to_numpy=True):
+        return np.ones((len(texts), 2), dtype=np.float32)
+
+def make_engine(events):
+    # No web search or LLM response cache files under data/cache
+    engine = RoadmapEngine(
+        roadmap_agent=RoadmapAgent(llm_cache_path=None),
+        resource_agent=ResourceAgent(web_cache_path=None)
+    )
+    engine.resource_agent._model = FakeModel()
+
+    async def stream_structure(goal):
+        events.append("generate")
+        for node in NODES:
+            await asyncio.sleep(0.05)  # well apart from the curation batch window
+            events.append(f"planned {node['id']}")
+            yield node
+
+    async def iter_resources_batch(queries, limit=3, semaphore=None):
+        events.append(f"curating {' | '.join(queries)}")
+        await asyncio.sleep(0.01)
+        for index, query in enumerate(queries):
+            yield index, [Resource(title=query, url="https://example.com", description="", type="course")]
+
+    engine.roadmap_agent.stream_structure = stream_structure
+    engine.resource_agent.iter_resources_batch = iter_resources_batch
+    engine.eval_pipeline.submit = lambda roadmap: None
+    return engine
+
+def test_curation_overlaps_generation():
+    events = []
+
+    async def run():
+        return await make_engine(events).generate_roadmap("Learn Steps")
+
+    roadmap = asyncio.run(run())
+    # Retrieval for the first node starts before the LLM has produced the second one
+    assert events.index("curating Step 0: Topic 0") < events.index("planned step_1")
+    assert [node.id for node in roadmap.nodes] == ["step_0", "step_1", "step_2"]
+    assert [node.resources[0].title for node in roadmap.nodes] == ["Step 0: Topic 0", "Step 1: Topic 1", "Step 2: Topic 2"]
+
+def test_stream_events():
+    async def run():
+        engine = make_engine([])
+        return [event async for event in engine.generate_roadmap_stream("Learn Steps")]
+
+    events = asyncio.run(run())
+    assert [event["event"] for event in events] == ["skeleton", "node", "node", "node", "done"]
+    assert all(not node["resources"] for node in events[0]["data"]["nodes"])
+    assert {event["data"]["id"] for event in events[1:4]} == {"step_0", "step_1", "step_2"}
+
+def test_nodes_parsed_together_share_one_batch():
+    events = []
+
+    async def run():
+        engine = make_engine(events)
+
+        async def stream_structure(goal):
+            # A cached completion arrives as one delta: every node is parsed at once
+            for node in NODES:
+                yield node
+
+        engine.roadmap_agent.stream_structure = stream_structure
+        return await engine.generate_roadmap("Learn Steps")
+
+    roadmap = asyncio.run(run())
+    assert events == ["curating Step 0: Topic 0 | Step 1: Topic 1 | Step 2: Topic 2"]
+    assert [node.resources[0].title for node in roadmap.nodes] == ["Step 0: Topic 0", "Step 1: Topic 1", "Step 2: Topic 2"]
+
+def test_staged_nodes_are_put_in_roadmap_order():
+    events = []
+
+    async def run():
+        engine = make_engine(events)
+        engine.hierarchical = True
+
+        async def stream_hierarchical_structure(goal):
+            # Stage 1 expands faster than stage 0, so their nodes arrive interleaved
+            arrivals = [("b/x", (1, 0)), ("a/x", (0, 0)), ("b/y", (1, 1)), ("a/y", (0, 1))]
+            for node_id, position in arrivals:
+                yield {"id": node_id, "title": node_id, "description": "", "prerequisites": [], "_position": position}
+
+        engine.roadmap_agent.stream_hierarchical_structure = stream_hierarchical_structure
+        return await engine.generate_roadmap("Learn Stages")
+
+    roadmap = asyncio.run(run())
+    assert [node.id for node in roadmap.nodes] == ["a/x", "a/y", "b/x", "b/y"]
+    # Resources follow their node through the reordering
+    assert [node.resources[0].title for node in roadmap.nodes] == ["a/x: ", "a/y: ", "b/x: ", "b/y: "]
+
+def test_semantic_hit_keeps_the_entry_expiry():
+    async def run():
+        engine = make_engine([])
+        engine.semantic_cache.ttl = 0.1
+        roadmap = await engine.generate_roadmap("Learn Steps")
+        engine.roadmap_cache.memory.clear()
+        await engine.semantic_cache.set("Learn Steps", roadmap)
+
+        # The fake encoder makes every goal a near duplicate
+        assert await engine._get_cached("Steps to learn") is not None
+        await asyncio.sleep(0.15)
+        # Neither the semantic entry nor the exact entry written from it outlives the source
+        return engine.roadmap_cache.get("Steps to learn"), await engine._get_cached("Steps to learn")
+
+    assert asyncio.run(run()) == (None, None)
+
+def test_semantic_cache_failure_still_returns_roadmap():
+    async def run():
+        engine = make_engine([])
+
+        async def broken_set(goal, roadmap):
+            raise RuntimeError("encoder unavailable")
+
+        engine.semantic_cache.set = broken_set
+        roadmap = await engine.generate_roadmap("Learn Steps")
+        return roadmap, engine.roadmap_cache.get("Learn Steps")
+
+    roadmap, cached = asyncio.run(run())
+    assert [node.id for node in roadmap.nodes] == ["step_0", "step_1", "step_2"]
+    assert cached is not None
+
+def test_concurrent_streams_share_generation():
+    calls = []
+
+    async def run():
+        engine = make_engine(calls)
+
+        async def collect():
+            return [event async for event in engine.generate_roadmap_stream("Learn Steps")]
+
+        return await asyncio.gather(collect(), collect(), engine.generate_roadmap("Learn Steps"))
+
+    first, second, roadmap = asyncio.run(run())
+    assert calls.count("generate") == 1
+    for events in (first, second):
+        assert [event["event"] for event in events] == ["skeleton", "node", "node", "node", "done"]
+        assert not events[-1]["data"]["cached"]
+    assert [node.id for node in roadmap.nodes] == ["step_0", "step_1", "step_2"]
+
+if __name__ == "__main__":
+    test_curation_overlaps_generation()
+    test_stream_events()
+    test_nodes_parsed_together_share_one_batch()
+    test_staged_nodes_are_put_in_roadmap_order()
+    test_semantic_hit_keeps_the_entry_expiry()
+    test_semantic_cache_failure_still_returns_roadmap()
+    test_concurrent_streams_share_generation()
+    print("All tests passed.")
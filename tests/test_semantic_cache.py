@@ -0,0 +1,75 @@
+import sys
+import os
+import time
+import asyncio
+sys.path.append(os.getcwd())
+
+import numpy as np
+from src.semantic_cache import SemanticGoalCache
+from src.models import RoadmapResponse, RoadmapNode
+
+VECTORS = {
+    "learn react": [1.0, 0.0, 0.0],
+    "react development": [0.95, 0.05, 0.0],
+    "sourdough bread baking": [0.0, 1.0, 0.0],
+}
+
+def make_cache(ttl=None):
+    calls = []
+
+    async def encode(texts):
+        calls.extend(texts)
+        return np.array([VECTORS[text] for text in texts], dtype=np.float32)
+
+    return SemanticGoalCache(encode, threshold=0.9, max_entries=2, ttl=ttl), calls
+
+def make_roadmap(goal):
+    return RoadmapResponse(goal=goal, nodes=[RoadmapNode(id="fundamentals", title="Fundamentals", description="JSX")])
+
+def test_near_duplicate_goal_hits():
+    cache, calls = make_cache()
+
+    async def run():
+        assert await cache.get("Learn React") is None
+        await cache.set("Learn React", make_roadmap("Learn React"))
+        hit = await cache.get("React Development")
+        miss = await cache.get("Sourdough Bread Baking")
+        return hit, miss
+
+    hit, miss = asyncio.run(run())
+    assert hit is not None and hit.goal == "React Development"
+    assert miss is None
+    assert cache.stats() == {"size": 1, "hits": 1, "misses": 2, "hit_rate": 1 / 3}
+    # The goal embedding is reused between the miss and the set
+    assert calls.count("learn react") == 1
+
+def test_eviction_keeps_index_bounded():
+    cache, _ = make_cache()
+
+    async def run():
+        for goal in VECTORS:
+            await cache.set(goal, make_roadmap(goal))
+        return await cache.get("learn react")
+
+    assert asyncio.run(run()) is not None  # "react development" is still close enough
+    assert cache.stats()["size"] == 2
+
+def test_entries_expire():
+    cache, _ = make_cache(ttl=0.05)
+
+    async def run():
+        await cache.set("Learn React", make_roadmap("Learn React"))
+        roadmap, expires_at = await cache.match("Learn React")
+        assert roadmap is not None and expires_at <= time.time() + 0.05
+        await asyncio.sleep(0.1)
+        # Even the identical goal (similarity 1.0) misses once its entry expired
+        return await cache.get("Learn React")
+
+    assert asyncio.run(run()) is None
+    assert cache.stats()["size"] == 0
+
+if __name__ == "__main__":
+    test_near_duplicate_goal_hits()
+    test_eviction_keeps_index_bounded()
+    test_entries_expire()
+    print("All tests passed.")
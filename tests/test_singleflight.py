@@ -0,0 +1,70 @@
+import sys
+import os
+import asyncio
+sys.path.append(os.getcwd())
+
+from src.singleflight import SingleFlight
+
+def test_concurrent_callers_share_one_call():
+    calls = [0]
+
+    async def work():
+        calls[0] += 1
+        await asyncio.sleep(0.05)
+        return "roadmap"
+
+    async def run():
+        flight = SingleFlight()
+        results = await asyncio.gather(*(flight.do("learn python", work) for _ in range(10)))
+        return flight, results
+
+    flight, results = asyncio.run(run())
+    assert calls[0] == 1
+    assert results == ["roadmap"] * 10
+    assert len(flight) == 0
+
+def test_failure_propagates_to_all_waiters():
+    async def work():
+        await asyncio.sleep(0.01)
+        raise ValueError("LLM down")
+
+    async def run():
+        flight = SingleFlight()
+        return await asyncio.gather(*(flight.do("k", work) for _ in range(3)), return_exceptions=True), flight
+
+    results, flight = asyncio.run(run())
+    assert all(isinstance(r, ValueError) for r in results)
+    assert "k" not in flight
+
+def test_cancellation_only_cancels_when_last_waiter_leaves():
+    async def run():
+        flight = SingleFlight()
+        finished = []
+
+        async def work():
+            await asyncio.sleep(0.05)
+            finished.append(True)
+            return 1
+
+        first = asyncio.ensure_future(flight.do("k", work))
+        second = asyncio.ensure_future(flight.do("k", work))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        assert await second == 1
+
+        # Now cancel the only waiter: the work must be cancelled and the key released
+        lone = asyncio.ensure_future(flight.do("k2", work))
+        await asyncio.sleep(0.01)
+        lone.cancel()
+        await asyncio.sleep(0.01)
+        return finished, flight
+
+    finished, flight = asyncio.run(run())
+    assert finished == [True]
+    assert len(flight) == 0
+
+if __name__ == "__main__":
+    test_concurrent_callers_share_one_call()
+    test_failure_propagates_to_all_waiters()
+    test_cancellation_only_cancels_when_last_waiter_leaves()
+    print("All tests passed.")
@@ -1,5 +1,6 @@
 import sys
 import os
+import asyncio
 
 # Add src to path
 sys.path.append(os.path.join(os.getcwd(), "src"))
@@ -9,7 +10,7 @@ from src.agents.resource_agent import ResourceAgent
 def verify():
     agent = ResourceAgent()
     print("Searching for 'Real Python'...")
-    results = agent.find_resources("Real Python", limit=10)
+    results = asyncio.run(agent.find_resources("Real Python", limit=10))
     
     found = False
     for res in results: